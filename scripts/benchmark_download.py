@@ -0,0 +1,67 @@
+"""Compares yen's download loop against the previous one, over local HTTP."""
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import time
+from functools import partial
+from urllib.request import urlopen
+
+import yen.downloader
+from yen.downloader import PROGRESS, download
+
+
+def previous_download(url: str, display_name: str, directory: str) -> str:
+    """The download loop yen used before, with a new `bytes` for every read."""
+    with PROGRESS:
+        filename = url.split("/")[-1]
+        filepath = os.path.join(directory, filename)
+        task_id = PROGRESS.add_task("download", display_name=display_name, start=False)
+        response = urlopen(url)
+
+        PROGRESS.update(task_id, total=int(response.info()["Content-length"]))
+        with open(filepath, "wb") as file:
+            PROGRESS.start_task(task_id)
+            for data in iter(partial(response.read, 32768), b""):
+                file.write(data)
+                PROGRESS.update(task_id, advance=len(data))
+
+    return filepath
+
+
+def main(size_mb: int) -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        served_directory = os.path.join(tempdir, "served")
+        os.makedirs(served_directory)
+        with open(os.path.join(served_directory, "python.tar.gz"), "wb") as file:
+            file.write(os.urandom(size_mb * 1024 * 1024))
+
+        handler = partial(
+            http.server.SimpleHTTPRequestHandler, directory=served_directory
+        )
+        http.server.SimpleHTTPRequestHandler.log_message = lambda *_: None  # type: ignore[method-assign]
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_port}/python.tar.gz"
+
+        results = []
+        for name, mode, function in (
+            ("previous loop", "rich", previous_download),
+            ("readinto, rich", "rich", download),
+            ("readinto, json", "json", download),
+            ("readinto, quiet", "quiet", download),
+        ):
+            yen.downloader.PROGRESS_MODE = mode
+            start = time.perf_counter()
+            os.remove(function(url, name, tempdir))
+            elapsed = time.perf_counter() - start
+            results.append(f"{name:>16}: {size_mb / elapsed:.0f} MB/s")
+
+        server.shutdown()
+        print("\n".join(results))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
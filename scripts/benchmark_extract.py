@@ -0,0 +1,47 @@
+"""Compares `tarfile.extractall` against yen's threaded extraction."""
+
+from __future__ import annotations
+
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+from yen.extract import extract_tarball
+
+
+def timed(function: object, *args: object, **kwargs: object) -> float:
+    start = time.perf_counter()
+    function(*args, **kwargs)  # type: ignore[operator]
+    return time.perf_counter() - start
+
+
+def extractall(tarball_path: str, destination: str) -> None:
+    with tarfile.open(tarball_path, mode="r:gz") as tar:
+        tar.extractall(destination)
+
+
+def main(tarball_path: str, directory: str | None) -> None:
+    with tempfile.TemporaryDirectory(dir=directory) as tempdir:
+        destination = os.path.join(tempdir, "python")
+
+        elapsed = timed(extractall, tarball_path, destination)
+        print(f"tarfile.extractall: {elapsed:.2f}s")
+        shutil.rmtree(destination)
+
+        for max_workers in (0, 1, 4, 8, 16):
+            elapsed = timed(
+                extract_tarball, tarball_path, destination, max_workers=max_workers
+            )
+            print(f"extract_tarball, {max_workers:>2} workers: {elapsed:.2f}s")
+            shutil.rmtree(destination)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} python.tar.gz [directory to extract in]")
+        sys.exit(1)
+
+    main(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
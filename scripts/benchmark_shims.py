@@ -0,0 +1,55 @@
+"""Compares startup time of a tool installed with each of yen's shim modes."""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from yen import SHIM_MODES
+
+
+def time_command(command: list[str], runs: int) -> tuple[float, float]:
+    """Returns the best and median wall times of the command, in milliseconds."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+
+    return min(timings) * 1000, statistics.median(timings) * 1000
+
+
+def main(package_name: str, module_name: str, python_version: str, runs: int) -> None:
+    with tempfile.TemporaryDirectory() as tempdir:
+        for shim in SHIM_MODES:
+            packages_path = os.path.join(tempdir, shim)
+            env = {**os.environ, "YEN_PACKAGES_PATH": packages_path}
+            for extra_args in ([], ["--module", module_name]):
+                subprocess.run(
+                    [
+                        *("yen", "install", package_name, "-p", python_version),
+                        *("--shim", shim, *extra_args),
+                    ],
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                )
+                shim_path = os.path.join(packages_path, package_name)
+                kind = "module" if extra_args else "binary"
+                best, median = time_command([shim_path, "--help"], runs)
+                print(
+                    f"{shim:>6} {kind:>6}: {best:.1f} ms best, {median:.1f} ms median"
+                )
+
+                os.remove(shim_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print(f"Usage: {sys.argv[0]} package_name module_name python_version [runs]")
+        sys.exit(1)
+
+    runs = int(sys.argv[4]) if len(sys.argv) > 4 else 20
+    main(sys.argv[1], sys.argv[2], sys.argv[3], runs)
@@ -2,18 +2,30 @@
 
 from __future__ import annotations
 
+import configparser
 import hashlib
+import json
 import os
 import os.path
 import platform
 import shutil
 import subprocess
 import sys
-import tarfile
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypedDict
 from urllib.request import urlretrieve
 
 from yen.downloader import download, read_url
-from yen.github import resolve_python_version
+from yen.extract import extract_tarball
+from yen.github import (
+    parse_python_version,
+    python_version_matches,
+    resolve_python_version,
+)
+from yen.installer import install_requirements
+from yen.manifest import write_manifest
+from yen.pypi import latest_version, normalize_name
 
 YEN_BIN_PATH = os.path.abspath(
     os.getenv("YEN_BIN_PATH", os.path.expanduser("~/.yen/bin"))
@@ -24,16 +36,104 @@ PYTHON_INSTALLS_PATH = os.path.abspath(
 PACKAGE_INSTALLS_PATH = os.path.abspath(
     os.getenv("YEN_PACKAGES_PATH", os.path.expanduser("~/.yen_packages"))
 )
+YEN_CACHE_PATH = os.path.abspath(
+    os.getenv("YEN_CACHE_PATH", os.path.expanduser("~/.yen/cache"))
+)
+# Read-only stores of Pythons shared by all users, like one baked into a base
+# image. They're searched before `PYTHON_INSTALLS_PATH`, and yen never
+# downloads into them, marks them as used, or removes anything from them.
+SHARED_PYTHON_INSTALLS_PATHS = [
+    os.path.abspath(path)
+    for path in os.getenv("YEN_SHARED_PYTHONS_PATH", "").split(os.pathsep)
+    if path
+]
 
 USERPATH_PATH = os.path.join(YEN_BIN_PATH, "userpath.pyz")
 MICROVENV_PATH = os.path.join(YEN_BIN_PATH, "microvenv.py")
+RELEASE_INDEX_PATH = os.path.join(YEN_CACHE_PATH, "release_index.json")
+WHEEL_CACHE_PATH = os.path.join(YEN_CACHE_PATH, "wheels")
 
 DEFAULT_PYTHON_VERSION = "3.12"
 
+# Set to a profile name, or a path to a file of glob patterns, to skip parts
+# of the Python builds that headless machines never use.
+SLIM_PROFILE = os.getenv("YEN_SLIM")
+SLIM_PROFILES = {
+    "headless": [
+        # Test suites
+        "python/lib/python3*/test/*",
+        "python/lib/test/*",
+        "*/ctypes/test/*",
+        "*/distutils/tests/*",
+        "*/lib2to3/tests/*",
+        "*/sqlite3/test/*",
+        "*/unittest/test/*",
+        # GUI libraries, along with their Tcl/Tk data
+        "*/idlelib/*",
+        "*/tkinter/*",
+        "*/turtledemo/*",
+        "*/turtle.py",
+        "*/_tkinter*",
+        "python/bin/idle3*",
+        "python/lib/itcl*",
+        "python/lib/libtcl*",
+        "python/lib/libtk*",
+        "python/lib/tcl*",
+        "python/lib/thread*",
+        "python/lib/tk*",
+        "python/tcl/*",
+    ],
+}
+SLIM_PROFILES["minimal"] = [
+    *SLIM_PROFILES["headless"],
+    "*/lib2to3/*",
+    "*/pydoc_data/*",
+    # Needed only for building C extensions, and for man pages
+    "python/include/*",
+    "python/lib/python3*/config-3*/*.a",
+    "python/share/*",
+]
+
+# Stored inside each downloaded Python's folder, and inside each tool's venv.
+PYTHON_METADATA_FILENAME = "yen_python.json"
+TOOL_METADATA_FILENAME = "yen_tool.json"
+# How the shim in `PACKAGE_INSTALLS_PATH` launches a tool:
+# - "script": pip's console script gets moved there, or for modules a
+#   shell script that runs `python -m`.
+# - "direct": a launcher with the venv's Python in its shebang, run in
+#   isolated mode (`-I`), that imports the entry point directly.
+# - "fast": same as "direct", but also skips the `site` module (`-I -S`), with
+#   the venv's `sys.path` precomputed at install time.
+SHIM_MODES = ("script", "direct", "fast")
+# What installs a tool's packages into its venv:
+# - "pip": pip, which gets installed into every venv to do so.
+# - "yen": yen's own wheel installer, so the venv doesn't need pip at all.
+INSTALLERS = ("pip", "yen")
+# Linux doesn't allow longer shebang lines on older kernels.
+MAX_SHEBANG_LENGTH = 127
+# Its modification time is when yen last used that Python or tool.
+LAST_USED_FILENAME = ".yen_last_used"
+
 
 class ExecutableDoesNotExist(Exception): ...
 
 
+class PythonMetadata(TypedDict):
+    version: str
+    download_link: str
+    checksum: str
+    slim_profile: str | None
+    excluded_patterns: list[str]
+
+
+class ToolMetadata(TypedDict):
+    package_name: str
+    executable_name: str
+    is_module: bool
+    shim: str
+    installer: str
+
+
 def check_path(path: str) -> None:
     """Check if given path is in PATH, and inform the user otherwise."""
     if platform.system() == "Windows":
@@ -74,14 +174,13 @@ def _ensure_microvenv() -> None:
 
 def find_or_download_python() -> str:
     """
-    Finds and returns any Python binary from `PYTHON_INSTALLS_PATH`.
-    If no Pythons exist, downloads the default version and returns that.
+    Finds and returns any Python binary from the shared Python stores, or
+    from `PYTHON_INSTALLS_PATH`. If no Pythons exist, downloads the default
+    version and returns that.
     """
-    for python_folder_name in os.listdir(PYTHON_INSTALLS_PATH):
-        python_folder = os.path.join(PYTHON_INSTALLS_PATH, python_folder_name)
-        python_bin_path = _python_bin_path(python_folder)
-        if os.path.isfile(python_bin_path):
-            return python_bin_path
+    for installs_path in (*SHARED_PYTHON_INSTALLS_PATHS, PYTHON_INSTALLS_PATH):
+        for python_version in _list_pythons_in(installs_path):
+            return python_binary_path(os.path.join(installs_path, python_version))
 
     # No Python binary found. Download one.
     _, python_bin_path = ensure_python(DEFAULT_PYTHON_VERSION)
@@ -98,7 +197,7 @@ def ensurepath() -> None:
     )
 
 
-def _python_bin_path(python_directory: str) -> str:
+def python_binary_path(python_directory: str) -> str:
     """Return the python binary path in a downloaded and extracted Python."""
     if platform.system() == "Windows":
         return os.path.join(python_directory, "python", "python.exe")
@@ -106,21 +205,157 @@ def _python_bin_path(python_directory: str) -> str:
         return os.path.join(python_directory, "python", "bin", "python3")
 
 
+def record_usage(directory: str) -> None:
+    """Marks the given Python or tool venv as just used."""
+    last_used_path = os.path.join(directory, LAST_USED_FILENAME)
+    try:
+        with open(last_used_path, "a"):
+            os.utime(last_used_path)
+    except OSError:
+        pass  # Read-only, so nothing there is going to be pruned either.
+
+
+def last_used_time(directory: str) -> float:
+    """Returns when yen last used the given Python or tool venv."""
+    last_used_path = os.path.join(directory, LAST_USED_FILENAME)
+    if os.path.exists(last_used_path):
+        return os.path.getmtime(last_used_path)
+
+    # Never recorded, so it has not been used since it was installed.
+    return os.path.getmtime(directory)
+
+
+def _list_pythons_in(installs_path: str) -> list[str]:
+    """Returns versions of all Pythons in the given folder, newest first."""
+    if not os.path.isdir(installs_path):
+        return []
+
+    installed_versions = [
+        python_folder_name
+        for python_folder_name in os.listdir(installs_path)
+        if os.path.isfile(
+            python_binary_path(os.path.join(installs_path, python_folder_name))
+        )
+    ]
+    return sorted(installed_versions, key=parse_python_version, reverse=True)
+
+
+def list_installed_pythons() -> list[str]:
+    """
+    Returns versions of all Pythons in the shared Python stores and in
+    `PYTHON_INSTALLS_PATH`, newest first.
+    """
+    installed_versions = {
+        python_version
+        for installs_path in (*SHARED_PYTHON_INSTALLS_PATHS, PYTHON_INSTALLS_PATH)
+        for python_version in _list_pythons_in(installs_path)
+    }
+    return sorted(installed_versions, key=parse_python_version, reverse=True)
+
+
+def python_directory(python_version: str) -> str:
+    """
+    Returns the folder of the given Python version, preferring the shared
+    Python stores. For Pythons that aren't in any of them, that's the folder
+    in `PYTHON_INSTALLS_PATH`, whether or not it is installed there.
+    """
+    for installs_path in SHARED_PYTHON_INSTALLS_PATHS:
+        python_folder = os.path.join(installs_path, python_version)
+        if os.path.isfile(python_binary_path(python_folder)):
+            return python_folder
+
+    return os.path.join(PYTHON_INSTALLS_PATH, python_version)
+
+
+def installed_python_version(python_version: str) -> str | None:
+    """Returns the newest installed version matching the requested one, if any."""
+    for installed_version in list_installed_pythons():
+        if python_version_matches(installed_version, python_version):
+            return installed_version
+
+    return None
+
+
 def ensure_python(python_version: str) -> tuple[str, str]:
-    """Checks if given Python version exists locally. If not, downloads it."""
+    """
+    Checks if given Python version exists locally. If not, downloads it.
+    The newest matching version in any of the stores is used, and the shared
+    Python stores are preferred when they have that same version, so only
+    the versions they don't have get downloaded into `PYTHON_INSTALLS_PATH`.
+    """
+    installed_version = installed_python_version(python_version)
+    if installed_version is not None:
+        python_folder = python_directory(installed_version)
+        # Shared stores may be read-only, and are not pruned by yen anyway.
+        if os.path.dirname(python_folder) == PYTHON_INSTALLS_PATH:
+            record_usage(python_folder)
+        return installed_version, python_binary_path(python_folder)
+
     os.makedirs(PYTHON_INSTALLS_PATH, exist_ok=True)
+    python_version, download_link = resolve_python_version(
+        python_version, RELEASE_INDEX_PATH
+    )
+    python_bin_path = download_python(python_version, download_link)
+    record_usage(os.path.join(PYTHON_INSTALLS_PATH, python_version))
+    return python_version, python_bin_path
 
-    for python_folder_name in os.listdir(PYTHON_INSTALLS_PATH):
-        python_folder = os.path.join(PYTHON_INSTALLS_PATH, python_folder_name)
-        if python_folder_name.startswith(python_version):
-            # already installed
-            python_bin_path = _python_bin_path(python_folder)
-            return python_folder_name, python_bin_path
 
-    python_version, download_link = resolve_python_version(python_version)
-    download_directory = os.path.join(PYTHON_INSTALLS_PATH, python_version)
+def download_python(
+    python_version: str,
+    download_link: str,
+    expected_checksum: str | None = None,
+    *,
+    slim_profile: str | None = SLIM_PROFILE,
+    download_directory: str | None = None,
+) -> str:
+    """
+    Downloads and extracts the given Python build into `PYTHON_INSTALLS_PATH`,
+    or into `download_directory` if given. If `expected_checksum` is given,
+    the download must match it as well. Returns path to the Python binary.
+    """
+    if download_directory is None:
+        download_directory = os.path.join(PYTHON_INSTALLS_PATH, python_version)
+    excluded_patterns = _slim_exclude_patterns(slim_profile)
 
     os.makedirs(download_directory, exist_ok=True)
+    try:
+        checksum = _download_and_extract_python(
+            python_version,
+            download_link,
+            download_directory,
+            expected_checksum,
+            excluded_patterns,
+        )
+    except BaseException:
+        # Don't leave a half-installed Python behind
+        shutil.rmtree(download_directory, ignore_errors=True)
+        raise
+
+    python_metadata: PythonMetadata = {
+        "version": python_version,
+        "download_link": download_link,
+        "checksum": checksum,
+        "slim_profile": slim_profile,
+        "excluded_patterns": excluded_patterns,
+    }
+    metadata_path = os.path.join(download_directory, PYTHON_METADATA_FILENAME)
+    with open(metadata_path, "w") as metadata_file:
+        json.dump(python_metadata, metadata_file, indent=2)
+
+    write_manifest(download_directory)
+    python_bin_path = python_binary_path(download_directory)
+    assert os.path.exists(python_bin_path)
+    return python_bin_path
+
+
+def _download_and_extract_python(
+    python_version: str,
+    download_link: str,
+    download_directory: str,
+    expected_checksum: str | None,
+    excluded_patterns: list[str],
+) -> str:
+    """Downloads, verifies and extracts a Python build. Returns its checksum."""
     downloaded_filepath = download(
         download_link,
         f"Downloading {python_version}",
@@ -132,31 +367,67 @@ def ensure_python(python_version: str) -> tuple[str, str]:
 
     # Validate checksum
     checksum_link = download_link + ".sha256"
-    expected_checksum = read_url(checksum_link).rstrip("\n")
+    expected_checksum = expected_checksum or read_url(checksum_link).rstrip("\n")
     if checksum != expected_checksum:
         print("\033[1;31mError:\033[m Checksum did not match!")
         os.remove(downloaded_filepath)
         raise SystemExit(1)
     print("Checksum verified!")
 
-    with tarfile.open(downloaded_filepath, mode="r:gz") as tar:
-        tar.extractall(download_directory)
+    # Excluded members are skipped as they stream out of the tarball,
+    # so they never touch the disk.
+    extract_tarball(
+        downloaded_filepath,
+        download_directory,
+        excluded_patterns=excluded_patterns,
+    )
 
     os.remove(downloaded_filepath)
+    return checksum
 
-    python_bin_path = _python_bin_path(download_directory)
-    assert os.path.exists(python_bin_path)
-    return python_version, python_bin_path
 
+def _slim_exclude_patterns(slim_profile: str | None) -> list[str]:
+    """Returns the glob patterns of files to skip, for the given slim profile."""
+    if not slim_profile:
+        return []
 
-def create_venv(python_bin_path: str, venv_path: str) -> None:
+    if slim_profile in SLIM_PROFILES:
+        return SLIM_PROFILES[slim_profile]
+
+    if not os.path.isfile(slim_profile):
+        print(
+            f"\033[1;31mError:\033[m YEN_SLIM should be one of"
+            f" {', '.join(SLIM_PROFILES)}, or a file of glob patterns."
+        )
+        raise SystemExit(1)
+
+    with open(slim_profile) as profile_file:
+        return [
+            line.strip().lower()
+            for line in profile_file
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+
+def read_python_metadata(python_directory: str) -> PythonMetadata | None:
+    """Returns the download metadata of an installed Python, if it was recorded."""
+    metadata_path = os.path.join(python_directory, PYTHON_METADATA_FILENAME)
+    if not os.path.exists(metadata_path):
+        return None
+
+    with open(metadata_path) as metadata_file:
+        return typing.cast(PythonMetadata, json.load(metadata_file))
+
+
+def create_venv(python_bin_path: str, venv_path: str, *, with_pip: bool = True) -> None:
     # if platform.system() == "Windows":
-    subprocess.run([python_bin_path, "-m", "venv", venv_path], check=True)
+    venv_args = [] if with_pip else ["--without-pip"]
+    subprocess.run([python_bin_path, "-m", "venv", *venv_args, venv_path], check=True)
     return
 
     # _ensure_microvenv()
     # subprocess.run([python_bin_path, MICROVENV_PATH, venv_path], check=True)
-    # venv_python_path = _venv_binary_path("python", venv_path)
+    # venv_python_path = venv_binary_path("python", venv_path)
     # subprocess.run(
     #     [venv_python_path, "-m", "ensurepip"],
     #     check=True,
@@ -164,7 +435,7 @@ def create_venv(python_bin_path: str, venv_path: str) -> None:
     # )
 
 
-def _venv_binary_path(binary_name: str, venv_path: str) -> str:
+def venv_binary_path(binary_name: str, venv_path: str) -> str:
     is_windows = platform.system() == "Windows"
     venv_bin_path = os.path.join(venv_path, "Scripts" if is_windows else "bin")
     binary_path = os.path.join(
@@ -173,17 +444,22 @@ def _venv_binary_path(binary_name: str, venv_path: str) -> str:
     return binary_path
 
 
-def install_package(
-    package_name: str,
-    python_bin_path: str,
-    executable_name: str,
-    *,
-    is_module: bool = False,
-    force_reinstall: bool = False,
-) -> tuple[str, bool]:
-    is_windows = platform.system() == "Windows"
+def read_venv_config(venv_path: str) -> dict[str, str]:
+    """Parses the `pyvenv.cfg` file of a venv."""
+    config: dict[str, str] = {}
+    with open(os.path.join(venv_path, "pyvenv.cfg")) as config_file:
+        for line in config_file:
+            key, sep, value = line.partition("=")
+            if sep:
+                config[key.strip()] = value.strip()
+
+    return config
+
+
+def tool_paths(package_name: str, is_module: bool = False) -> tuple[str, str]:
+    """Returns the shim path and venv path for an installed tool."""
     shim_path = os.path.join(PACKAGE_INSTALLS_PATH, package_name)
-    if is_windows:
+    if platform.system() == "Windows":
         # This is somewhat of a hack.
         # For the condition where shim_path exists and we do `yen run`,
         # `is_module` is false but we still want to return early.
@@ -196,32 +472,240 @@ def install_package(
 
     venv_name = f"venv_{package_name}"
     venv_path = os.path.join(PACKAGE_INSTALLS_PATH, venv_name)
+    return shim_path, venv_path
+
+
+def list_installed_tools() -> list[str]:
+    """Returns the package names of all tools installed by yen."""
+    if not os.path.isdir(PACKAGE_INSTALLS_PATH):
+        return []
+
+    return sorted(
+        folder_name[len("venv_") :]
+        for folder_name in os.listdir(PACKAGE_INSTALLS_PATH)
+        if folder_name.startswith("venv_")
+    )
+
+
+def read_tool_metadata(package_name: str) -> ToolMetadata:
+    """
+    Returns how the given tool was installed. For tools installed before this
+    metadata was being recorded, it is inferred from the shim.
+    """
+    shim_path, venv_path = tool_paths(package_name)
+    metadata_path = os.path.join(venv_path, TOOL_METADATA_FILENAME)
+    if os.path.exists(metadata_path):
+        with open(metadata_path) as metadata_file:
+            tool_metadata = typing.cast(ToolMetadata, json.load(metadata_file))
+
+        tool_metadata.setdefault("shim", "script")
+        tool_metadata.setdefault("installer", "pip")
+        return tool_metadata
+
+    executable_name = package_name
+    is_module = False
+    if platform.system() == "Windows":
+        is_module = shim_path.endswith(".bat")
+    elif os.path.exists(shim_path):
+        with open(shim_path, "rb") as shim:
+            is_module = shim.readline().startswith(b"#!/bin/sh")
+
+    if is_module:
+        with open(shim_path) as shim:
+            executable_name = shim.read().split(" -m ")[-1].split()[0]
+
+    return {
+        "package_name": package_name,
+        "executable_name": executable_name,
+        "is_module": is_module,
+        "shim": "script",
+        "installer": "pip",
+    }
+
+
+def site_packages_paths(venv_path: str) -> list[str]:
+    if platform.system() == "Windows":
+        return [os.path.join(venv_path, "Lib", "site-packages")]
+
+    lib_path = os.path.join(venv_path, "lib")
+    return [
+        os.path.join(lib_path, python_folder_name, "site-packages")
+        for python_folder_name in os.listdir(lib_path)
+    ]
+
+
+def _find_entry_point(venv_path: str, executable_name: str) -> str | None:
+    """Returns the `module:attribute` console script entry point, if any."""
+    for site_packages_path in site_packages_paths(venv_path):
+        for file_name in os.listdir(site_packages_path):
+            entry_points_path = os.path.join(
+                site_packages_path, file_name, "entry_points.txt"
+            )
+            if not file_name.endswith(".dist-info") or not os.path.isfile(
+                entry_points_path
+            ):
+                continue
+
+            entry_points = configparser.ConfigParser(delimiters=("=",))
+            entry_points.optionxform = str  # type: ignore[assignment,method-assign]
+            entry_points.read(entry_points_path)
+            if entry_points.has_option("console_scripts", executable_name):
+                entry_point = entry_points.get("console_scripts", executable_name)
+                # Drop extras, like in `module:function [extra]`
+                return entry_point.split("[")[0].strip()
+
+    return None
+
+
+def _venv_sys_path(venv_python_path: str, *python_flags: str) -> list[str]:
+    sys_path_json = subprocess.run(
+        [
+            venv_python_path,
+            *python_flags,
+            "-c",
+            "import json, sys; print(json.dumps(sys.path))",
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return typing.cast("list[str]", json.loads(sys_path_json))
+
+
+def _write_launcher(
+    shim_path: str,
+    venv_path: str,
+    tool_metadata: ToolMetadata,
+) -> bool:
+    """
+    Writes a "direct" or "fast" shim, that execs the venv's Python straight
+    from its shebang. Returns False if the tool has no entry point to launch.
+    """
+    venv_python_path = venv_binary_path("python", venv_path)
+    executable_name = tool_metadata["executable_name"]
+    is_fast = tool_metadata["shim"] == "fast"
+    python_flags = "-IS" if is_fast else "-I"
+
+    code_lines = ["import sys"]
+    if is_fast:
+        # Only the venv-specific entries, as the stdlib ones come from the
+        # base Python, which might get upgraded under the venv later on.
+        base_sys_path = _venv_sys_path(venv_python_path, "-I", "-S")
+        venv_sys_path = [
+            path
+            for path in _venv_sys_path(venv_python_path, "-I")
+            if path not in base_sys_path
+        ]
+        code_lines.append(f"sys.path.extend({venv_sys_path!r})")
+
+    if tool_metadata["is_module"]:
+        code_lines += [
+            "import runpy",
+            f"runpy.run_module({executable_name!r}, run_name='__main__', alter_sys=True)",
+        ]
+    else:
+        entry_point = _find_entry_point(venv_path, executable_name)
+        if entry_point is None:
+            return False
+
+        module_name, _, attribute = entry_point.partition(":")
+        code_lines += [
+            f"from {module_name} import {attribute.split('.')[0]}",
+            f"sys.exit({attribute}())",
+        ]
+
+    shebang = f"#!{venv_python_path} {python_flags}"
+    if len(shebang) > MAX_SHEBANG_LENGTH or " " in venv_python_path:
+        # Same trick that pip uses: a file that is valid as both sh and Python,
+        # where sh immediately execs Python on the same file.
+        shebang = (
+            "#!/bin/sh\n"
+            f'\'\'\'exec\' "{venv_python_path}" {python_flags} "$0" "$@"\n'
+            "' '''"
+        )
+
+    with open(shim_path + ".tmp", "w") as file:
+        file.write(shebang + "\n" + "\n".join(code_lines) + "\n")
+
+    os.chmod(shim_path + ".tmp", 0o777)
+    os.replace(shim_path + ".tmp", shim_path)
+    return True
+
+
+def install_package(
+    package_name: str,
+    python_bin_path: str,
+    executable_name: str,
+    *,
+    is_module: bool = False,
+    force_reinstall: bool = False,
+    requirements_file: str | None = None,
+    shim: str = "script",
+    installer: str = "pip",
+) -> tuple[str, bool]:
+    """
+    Installs the package into its own venv, and puts a shim for it into
+    `PACKAGE_INSTALLS_PATH`. If `requirements_file` is given, the venv's
+    contents are installed from it as-is, with pinned hashes and no resolution.
+    """
+    is_windows = platform.system() == "Windows"
+    if is_windows:
+        # Windows needs `.exe` or `.bat` shims, so there's no shebang to use.
+        shim = "script"
+
+    if is_windows or requirements_file is not None:
+        # yen's installer can't write `.exe` launchers, nor install lockfiles.
+        installer = "pip"
+
+    shim_path, venv_path = tool_paths(package_name, is_module)
     if os.path.exists(shim_path):
         if not force_reinstall:
+            record_usage(venv_path)
             return shim_path, True  # True as in package already existed
         else:
             os.remove(shim_path)
             shutil.rmtree(venv_path, ignore_errors=True)
 
-    create_venv(python_bin_path, venv_path)
+    create_venv(python_bin_path, venv_path, with_pip=installer == "pip")
 
-    venv_python_path = _venv_binary_path("python", venv_path)
-    subprocess.run(
-        [venv_python_path, "-m", "pip", "install", package_name],
-        check=True,
-        capture_output=True,
-    )
+    venv_python_path = venv_binary_path("python", venv_path)
+    if installer == "yen":
+        try:
+            install_requirements(venv_python_path, [package_name], WHEEL_CACHE_PATH)
+        except BaseException:
+            shutil.rmtree(venv_path, ignore_errors=True)
+            raise
+    else:
+        if requirements_file is None:
+            pip_args = [package_name]
+        else:
+            pip_args = ["--no-deps", "--require-hashes", "-r", requirements_file]
 
-    if is_module:
+        subprocess.run(
+            [venv_python_path, "-m", "pip", "install", *pip_args],
+            check=True,
+            capture_output=True,
+        )
+
+    tool_metadata: ToolMetadata = {
+        "package_name": package_name,
+        "executable_name": executable_name,
+        "is_module": is_module,
+        "shim": shim,
+        "installer": installer,
+    }
+    if shim != "script" and _write_launcher(shim_path, venv_path, tool_metadata):
+        pass
+    elif is_module:
         with open(shim_path, "w") as file:
             if is_windows:
                 file.write(f"@echo off\n{venv_python_path} -m {package_name} %*")
             else:
-                file.write(f'#!/bin/sh\n{venv_python_path} -m {package_name} "$@"')
+                file.write(f'#!/bin/sh\nexec {venv_python_path} -m {package_name} "$@"')
 
         os.chmod(shim_path, 0o777)
     else:
-        executable_path = _venv_binary_path(executable_name, venv_path)
+        executable_path = venv_binary_path(executable_name, venv_path)
         if not os.path.exists(executable_path):
             # cleanup the venv created
             shutil.rmtree(venv_path)
@@ -229,5 +713,240 @@ def install_package(
 
         # the created binary is always moveable
         shutil.move(executable_path, shim_path)
+        # In case there was no entry point to write a launcher for
+        tool_metadata["shim"] = "script"
+
+    metadata_path = os.path.join(venv_path, TOOL_METADATA_FILENAME)
+    with open(metadata_path, "w") as metadata_file:
+        json.dump(tool_metadata, metadata_file, indent=2)
 
+    write_manifest(venv_path)
+    record_usage(venv_path)
     return shim_path, False  # False as in package didn't exist and was just installed
+
+
+def uninstall_package(package_name: str) -> None:
+    """Removes the tool's shim and its venv."""
+    shim_path, venv_path = tool_paths(package_name)
+    if os.path.exists(shim_path):
+        os.remove(shim_path)
+
+    shutil.rmtree(venv_path, ignore_errors=True)
+
+
+def installed_package_version(venv_path: str, package_name: str) -> str | None:
+    """Returns the version of the package installed in the venv, if any."""
+    normalized_name = normalize_name(package_name)
+    for site_packages_path in site_packages_paths(venv_path):
+        for file_name in os.listdir(site_packages_path):
+            if not file_name.endswith(".dist-info"):
+                continue
+
+            name, _, version = file_name[: -len(".dist-info")].rpartition("-")
+            if normalize_name(name) == normalized_name:
+                return version
+
+    return None
+
+
+def find_outdated_packages(
+    package_names: list[str],
+) -> dict[str, tuple[str | None, str]]:
+    """
+    Checks the given tools against the package index, in parallel.
+    Returns the installed and latest versions of the ones that are out of date.
+    """
+
+    def check(package_name: str) -> tuple[str | None, str]:
+        _, venv_path = tool_paths(package_name)
+        return (
+            installed_package_version(venv_path, package_name),
+            latest_version(package_name),
+        )
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        versions = dict(zip(package_names, executor.map(check, package_names)))
+
+    return {
+        package_name: (installed_version, newest_version)
+        for package_name, (installed_version, newest_version) in versions.items()
+        if installed_version != newest_version
+    }
+
+
+def upgrade_package(package_name: str) -> str | None:
+    """
+    Upgrades the tool in place, and returns its version after the upgrade.
+    Only the distributions that changed are reinstalled, and the shim is
+    swapped in atomically at the end, so the tool is never left without a shim.
+    """
+    tool_metadata = read_tool_metadata(package_name)
+    shim_path, venv_path = tool_paths(package_name, tool_metadata["is_module"])
+    old_version = installed_package_version(venv_path, package_name)
+
+    venv_python_path = venv_binary_path("python", venv_path)
+    if tool_metadata["installer"] == "yen":
+        install_requirements(
+            venv_python_path, [package_name], WHEEL_CACHE_PATH, upgrade=True
+        )
+    else:
+        subprocess.run(
+            [venv_python_path, "-m", "pip", "install", "--upgrade", package_name],
+            check=True,
+            capture_output=True,
+        )
+
+    new_version = installed_package_version(venv_path, package_name)
+    # An unchanged package doesn't get its console script written back.
+    if new_version != old_version:
+        refresh_shim(tool_metadata)
+    write_manifest(venv_path)
+    return new_version
+
+
+def refresh_shim(tool_metadata: ToolMetadata) -> None:
+    """
+    Points the tool's shim at what was just (re)installed into its venv.
+    Script shims are swapped in atomically, so the tool is never without one.
+    """
+    shim_path, venv_path = tool_paths(
+        tool_metadata["package_name"], tool_metadata["is_module"]
+    )
+    if tool_metadata["shim"] != "script":
+        # The entry point, or with "fast" shims, sys.path might have changed.
+        if not _write_launcher(shim_path, venv_path, tool_metadata):
+            raise ExecutableDoesNotExist
+        return
+
+    if tool_metadata["is_module"]:
+        # The module shim only points at the venv's Python, nothing to swap.
+        return
+
+    executable_path = venv_binary_path(tool_metadata["executable_name"], venv_path)
+    if not os.path.exists(executable_path):
+        raise ExecutableDoesNotExist
+
+    os.replace(executable_path, shim_path)
+
+
+def venv_python_version(venv_path: str) -> str:
+    return read_venv_config(venv_path)["version"]
+
+
+def tool_venvs_using_python(python_version: str) -> list[str]:
+    """Returns the venv paths of all tools that run on the given Python."""
+    venv_paths = []
+    for package_name in list_installed_tools():
+        _, venv_path = tool_paths(package_name)
+        try:
+            tool_python_version = venv_python_version(venv_path)
+        except (OSError, KeyError):
+            continue  # A broken venv, `yen verify` can tell more
+
+        if tool_python_version == python_version:
+            venv_paths.append(venv_path)
+
+    return venv_paths
+
+
+def rewire_venv(venv_path: str, python_bin_path: str, python_version: str) -> None:
+    """
+    Points an existing venv at another build of the same minor Python version,
+    by rewriting its `pyvenv.cfg` and interpreter symlinks. Nothing inside the
+    venv's site-packages has to change, as the `lib/pythonX.Y` path stays same.
+    """
+    config_path = os.path.join(venv_path, "pyvenv.cfg")
+    old_config = read_venv_config(venv_path)
+    old_home = old_config["home"]
+    new_home = os.path.dirname(python_bin_path)
+
+    new_values = {
+        "home": new_home,
+        "version": python_version,
+        "executable": os.path.realpath(python_bin_path),
+        "command": f"{python_bin_path} -m venv {venv_path}",
+    }
+    with open(config_path) as config_file:
+        config_lines = config_file.readlines()
+
+    with open(config_path + ".tmp", "w") as config_file:
+        for line in config_lines:
+            key = line.partition("=")[0].strip()
+            if key in new_values:
+                line = f"{key} = {new_values[key]}\n"
+            config_file.write(line)
+
+    os.replace(config_path + ".tmp", config_path)
+
+    if platform.system() == "Windows":
+        # Windows venvs use a launcher, that reads `home` from `pyvenv.cfg`.
+        write_manifest(venv_path)
+        return
+
+    venv_bin_path = os.path.dirname(venv_binary_path("python", venv_path))
+    old_python_folder = os.path.dirname(os.path.dirname(old_home))
+    for file_name in os.listdir(venv_bin_path):
+        link_path = os.path.join(venv_bin_path, file_name)
+        if not os.path.islink(link_path):
+            continue
+
+        link_target = os.readlink(link_path)
+        if not link_target.startswith(old_python_folder + os.sep):
+            continue
+
+        new_link_target = os.path.join(new_home, os.path.basename(link_target))
+        os.symlink(new_link_target, link_path + ".tmp")
+        os.replace(link_path + ".tmp", link_path)
+
+    write_manifest(venv_path)
+
+
+def upgrade_python(
+    requested_version: str,
+    *,
+    remove_old: bool = False,
+) -> tuple[str, list[str], list[str]]:
+    """
+    Installs the latest patch release of the requested Python version, and
+    moves every tool venv on an older patch of it over to the new one.
+    Returns the new version, the migrated venvs and the removed Pythons.
+    """
+    python_version, download_link = resolve_python_version(
+        requested_version, RELEASE_INDEX_PATH
+    )
+    python_folder = python_directory(python_version)
+    python_bin_path = python_binary_path(python_folder)
+    if not os.path.isfile(python_bin_path):
+        python_bin_path = download_python(python_version, download_link)
+
+    minor_version = parse_python_version(python_version)[:2]
+    superseded_versions = [
+        installed_version
+        for installed_version in list_installed_pythons()
+        if parse_python_version(installed_version)[:2] == minor_version
+        and parse_python_version(installed_version)
+        < parse_python_version(python_version)
+    ]
+
+    migrated_venvs = []
+    for old_version in superseded_versions:
+        for venv_path in tool_venvs_using_python(old_version):
+            rewire_venv(venv_path, python_bin_path, python_version)
+            migrated_venvs.append(venv_path)
+
+    removed_versions = []
+    if remove_old:
+        for old_version in superseded_versions:
+            # Project venvs made with `yen create` may still point at it,
+            # but we only keep track of the tool venvs.
+            if tool_venvs_using_python(old_version):
+                continue
+
+            old_python_folder = os.path.join(PYTHON_INSTALLS_PATH, old_version)
+            if not os.path.isdir(old_python_folder):
+                continue  # Only in a shared store, which is left alone.
+
+            shutil.rmtree(old_python_folder)
+            removed_versions.append(old_version)
+
+    return python_version, migrated_venvs, removed_versions
@@ -0,0 +1,112 @@
+"""Throwaway venvs cached by what went into them, like the ones for `yen run`."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import subprocess
+
+from yen import (
+    YEN_CACHE_PATH,
+    create_venv,
+    last_used_time,
+    record_usage,
+    venv_binary_path,
+)
+from yen.storage import directory_size
+
+RUN_CACHE_PATH = os.path.join(YEN_CACHE_PATH, "run")
+EXEC_CACHE_PATH = os.path.join(YEN_CACHE_PATH, "exec")
+# Written last, so a venv without it was interrupted while being set up.
+CACHE_KEY_FILENAME = "yen_cache_key.json"
+# Limits for each cache directory, least recently used venvs are evicted first.
+MAX_CACHED_VENVS = int(os.getenv("YEN_CACHE_MAX_VENVS", "20"))
+MAX_CACHE_SIZE = int(os.getenv("YEN_CACHE_MAX_SIZE_MB", "2048")) * 1024 * 1024
+
+
+def _cache_key_hash(cache_key: list[str]) -> str:
+    return hashlib.sha256(json.dumps(cache_key).encode()).hexdigest()[:16]
+
+
+def ensure_cached_venv(
+    cache_path: str,
+    cache_key: list[str],
+    python_bin_path: str,
+    requirements: list[str],
+) -> str:
+    """
+    Returns a venv with the requirements installed, keyed by `cache_key`.
+    The venv is reused as-is while it stays in the cache, so it only gets
+    created and installed into the first time.
+    """
+    venv_path = os.path.join(cache_path, _cache_key_hash(cache_key))
+    cache_key_path = os.path.join(venv_path, CACHE_KEY_FILENAME)
+    if os.path.exists(cache_key_path):
+        record_usage(venv_path)
+        return venv_path
+
+    # Leftovers of an interrupted setup
+    shutil.rmtree(venv_path, ignore_errors=True)
+    try:
+        create_venv(python_bin_path, venv_path)
+        if requirements:
+            subprocess.run(
+                [
+                    *(venv_binary_path("python", venv_path), "-m", "pip"),
+                    *("install", *requirements),
+                ],
+                check=True,
+                capture_output=True,
+            )
+    except BaseException:
+        shutil.rmtree(venv_path, ignore_errors=True)
+        raise
+
+    with open(cache_key_path, "w") as cache_key_file:
+        json.dump(cache_key, cache_key_file)
+
+    record_usage(venv_path)
+    evict_cached_venvs(cache_path, keep=venv_path)
+    return venv_path
+
+
+def evict_cached_venvs(
+    cache_path: str,
+    *,
+    keep: str | None = None,
+    max_venvs: int = MAX_CACHED_VENVS,
+    max_size: int = MAX_CACHE_SIZE,
+) -> list[str]:
+    """
+    Removes the least recently used venvs in the cache, until it is within
+    both limits. The `keep` venv is never removed. Returns the removed paths.
+    """
+    if not os.path.isdir(cache_path):
+        return []
+
+    venv_paths = sorted(
+        (os.path.join(cache_path, name) for name in os.listdir(cache_path)),
+        key=last_used_time,
+        reverse=True,
+    )
+    venv_sizes = {venv_path: directory_size(venv_path) for venv_path in venv_paths}
+    total_size = sum(venv_sizes.values())
+
+    removed_paths = []
+    # Oldest first
+    for index, venv_path in reversed(list(enumerate(venv_paths))):
+        if venv_path == keep:
+            continue
+
+        remaining_venvs = index + 1
+        if remaining_venvs <= max_venvs and total_size <= max_size:
+            break
+
+        shutil.rmtree(venv_path, ignore_errors=True)
+        total_size -= venv_sizes[venv_path]
+        removed_paths.append(venv_path)
+
+    return removed_paths
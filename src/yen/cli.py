@@ -6,30 +6,113 @@ import argparse
 import os.path
 import subprocess
 import sys
+import time
+import urllib.error
 from typing import Literal
 
 from yen import (
     DEFAULT_PYTHON_VERSION,
+    INSTALLERS,
     PACKAGE_INSTALLS_PATH,
+    RELEASE_INDEX_PATH,
+    SHIM_MODES,
     ExecutableDoesNotExist,
     check_path,
     create_venv,
     ensure_python,
     ensurepath,
+    find_outdated_packages,
     install_package,
+    list_installed_tools,
+    record_usage,
+    tool_paths,
+    uninstall_package,
+    upgrade_package,
+    upgrade_python,
+    venv_binary_path,
 )
-from yen.github import NotAvailable, list_pythons
+from yen.cache import EXEC_CACHE_PATH, RUN_CACHE_PATH, ensure_cached_venv
+from yen.github import (
+    NotAvailable,
+    list_pythons,
+    read_release_index,
+    update_release_index,
+)
+from yen.installer import InstallerError
+from yen.lock import (
+    DEFAULT_LOCKFILE_PATH,
+    LockError,
+    create_lockfile,
+    install_locked_tool,
+    read_lockfile,
+    write_lockfile,
+)
+from yen.matrix import prepare_venvs, run_matrix
+from yen.pypi import PackageNotFound, requirement_name
+from yen.script import (
+    ScriptError,
+    pick_python_version,
+    python_satisfies,
+    read_script_metadata,
+)
+from yen.storage import disk_usage, format_size, prune
+from yen.sync import SyncError, sync_venv
+from yen.template import (
+    TemplateError,
+    create_from_template,
+    list_templates,
+    remove_template,
+    save_template,
+)
+from yen.verify import repair_python, repair_tool, verify_installs
 
 
 class YenArgs:
-    command: Literal["list", "ensurepath", "create", "install", "run", "exec"]
-    python: str
+    command: Literal[
+        "list",
+        "ensurepath",
+        "create",
+        "install",
+        "run",
+        "exec",
+        "matrix",
+        "lock",
+        "upgrade",
+        "python",
+        "uninstall",
+        "du",
+        "prune",
+        "sync",
+        "verify",
+        "template",
+    ]
+    python_command: Literal["upgrade"]
+    template_command: Literal["save", "list", "remove"]
+    template_name: str
+    template: str | None
+    python_version: str
+    remove_old: bool
+    python: str  # only `run`, `exec` and `create --from` allow omitting it
     venv_path: str
-    package_name: str
+    package_name: str  # only `install --lockfile` allows omitting it
+    package_names: list[str]
     binary: str | None
     module: str | None
     force_reinstall: bool
+    shim: str
+    installer: str
+    all: bool
+    older_than: float | None
+    pythons: bool
+    keep: int | None
+    dry_run: bool
+    repair: bool
+    script: str | None
+    lockfile: str | None
+    output: str
+    requirements: list[str] | None
     run_args: list[str]
+    jobs: int | None
 
 
 def cli() -> int:
@@ -37,15 +120,57 @@ def cli() -> int:
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    subparsers.add_parser("list")
+    list_parser = subparsers.add_parser("list")
+    list_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Include older Pythons, from all python-build-standalone releases.",
+    )
     subparsers.add_parser("ensurepath")
 
     create_parser = subparsers.add_parser("create")
     create_parser.add_argument("venv_path", type=os.path.abspath)
-    create_parser.add_argument("-p", "--python", required=True)
+    create_parser.add_argument("-p", "--python")
+    create_parser.add_argument(
+        "--from",
+        dest="template",
+        help="Clone the venv from this template, instead of creating it empty.",
+    )
+
+    template_parser = subparsers.add_parser(
+        "template",
+        help="Save venvs as templates, to quickly create new venvs from.",
+    )
+    template_subparsers = template_parser.add_subparsers(
+        dest="template_command", required=True
+    )
+    template_save_parser = template_subparsers.add_parser("save")
+    template_save_parser.add_argument("template_name")
+    template_save_parser.add_argument("venv_path", type=os.path.abspath)
+    template_subparsers.add_parser("list")
+    template_remove_parser = template_subparsers.add_parser("remove")
+    template_remove_parser.add_argument("template_name")
+
+    sync_parser = subparsers.add_parser(
+        "sync",
+        help="Create or update a venv to match requirements files or pyproject.toml.",
+    )
+    sync_parser.add_argument(
+        "venv_path", nargs="?", default=".venv", type=os.path.abspath
+    )
+    sync_parser.add_argument("-p", "--python", default=DEFAULT_PYTHON_VERSION)
+    sync_parser.add_argument(
+        "-r",
+        "--requirements",
+        action="append",
+        help=(
+            "Requirements file or pyproject.toml to sync from, can be repeated."
+            " Defaults to requirements.txt, or pyproject.toml if there is none."
+        ),
+    )
 
     install_parser = subparsers.add_parser("install")
-    install_parser.add_argument("package_name")
+    install_parser.add_argument("package_name", nargs="?")
     install_parser.add_argument("-p", "--python", default=DEFAULT_PYTHON_VERSION)
     install_parser.add_argument(
         "--binary",
@@ -56,24 +181,184 @@ def cli() -> int:
         help="Use if package should be run as a module, i.e. `python -m <module_name>`",
     )
     install_parser.add_argument("--force-reinstall", action="store_true")
+    install_parser.add_argument(
+        "--shim",
+        choices=SHIM_MODES,
+        default="script",
+        help=(
+            "How the installed command launches the tool. `direct` and `fast`"
+            " exec Python directly in isolated mode, `fast` also skips `site`"
+            " for quicker startup."
+        ),
+    )
+    install_parser.add_argument(
+        "--installer",
+        choices=INSTALLERS,
+        default="pip",
+        help=(
+            "What installs the package. `yen` installs wheels itself, without"
+            " putting pip in the tool's venv."
+        ),
+    )
+    install_parser.add_argument(
+        "--lockfile",
+        help="Install tools exactly as pinned in this lockfile, without resolving.",
+    )
+
+    lock_parser = subparsers.add_parser("lock")
+    lock_parser.add_argument(
+        "package_names",
+        help="Tools to lock. Defaults to all installed tools.",
+        nargs="*",
+    )
+    lock_parser.add_argument("-o", "--output", default=DEFAULT_LOCKFILE_PATH)
+
+    upgrade_parser = subparsers.add_parser("upgrade")
+    upgrade_parser.add_argument("package_names", nargs="*")
+    upgrade_parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Upgrade all installed tools that are out of date.",
+    )
+
+    uninstall_parser = subparsers.add_parser("uninstall")
+    uninstall_parser.add_argument("package_name")
+
+    subparsers.add_parser("du", help="Show disk usage of Pythons and tools.")
+
+    prune_parser = subparsers.add_parser(
+        "prune",
+        help="Remove unused tools and Pythons, and leftovers of failed downloads.",
+    )
+    prune_parser.add_argument(
+        "--older-than",
+        type=float,
+        metavar="DAYS",
+        help=(
+            "Remove tools not run in this many days, by yen or through their"
+            " command. Use of a tool's command is only seen on filesystems"
+            " that track access times."
+        ),
+    )
+    prune_parser.add_argument(
+        "--keep",
+        type=int,
+        metavar="N",
+        help="Keep only the N most recently used tools.",
+    )
+    prune_parser.add_argument(
+        "--pythons",
+        action="store_true",
+        help=(
+            "With --older-than, also remove Pythons yen didn't use in that many"
+            " days, unless a tool, template or cached venv needs them. Venvs"
+            " made with `yen create`, `yen sync` or `yen matrix` are not"
+            " tracked, and break if their Python is removed."
+        ),
+    )
+    prune_parser.add_argument("--dry-run", action="store_true")
+
+    verify_parser = subparsers.add_parser(
+        "verify",
+        help="Check installed Pythons and tools for missing or modified files.",
+    )
+    verify_parser.add_argument(
+        "--repair",
+        action="store_true",
+        help="Download damaged Pythons again, and reinstall damaged tools.",
+    )
+
+    python_parser = subparsers.add_parser("python")
+    python_subparsers = python_parser.add_subparsers(
+        dest="python_command", required=True
+    )
+    python_upgrade_parser = python_subparsers.add_parser(
+        "upgrade",
+        help="Install the latest patch release, and move tools over to it.",
+    )
+    python_upgrade_parser.add_argument("python_version")
+    python_upgrade_parser.add_argument(
+        "--remove-old",
+        action="store_true",
+        help="Delete older patch releases that are no longer used by any tool.",
+    )
 
     # TODO: add long help texts to each subparser
-    run_parser = subparsers.add_parser("run")
-    run_parser.add_argument("package_name")
-    run_parser.add_argument("-p", "--python", default=DEFAULT_PYTHON_VERSION)
+    run_parser = subparsers.add_parser(
+        "run",
+        help=(
+            "Run a tool in a cached, throwaway environment. Uses the installed"
+            " tool instead, if there is one and no version or Python is given."
+        ),
+    )
+    run_parser.add_argument(
+        "package_name", help="Package to run, can be pinned like `ruff==0.4.1`."
+    )
+    run_parser.add_argument("-p", "--python")
     run_parser.add_argument(
         "run_args",
         help="Arguments to pass to the command invocation",
         nargs="*",
     )
 
-    exec_parser = subparsers.add_parser("exec")
-    exec_parser.add_argument("-p", "--python", default=DEFAULT_PYTHON_VERSION)
+    exec_parser = subparsers.add_parser(
+        "exec",
+        help=(
+            "Run a Python script, with the Python and dependencies in its inline"
+            " metadata. Without a script, starts the Python REPL."
+        ),
+    )
+    exec_parser.add_argument("-p", "--python")
+    exec_parser.add_argument("script", nargs="?")
+    exec_parser.add_argument(
+        "run_args",
+        help="Arguments to pass to the script",
+        nargs=argparse.REMAINDER,
+    )
+
+    matrix_parser = subparsers.add_parser(
+        "matrix",
+        help="Run a command in a venv of each Python version, in parallel.",
+    )
+    matrix_parser.add_argument(
+        "-p",
+        "--python",
+        required=True,
+        help="Comma separated Python versions, like 3.11,3.12",
+    )
+    matrix_parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="How many versions to run at once. Defaults to all of them.",
+    )
+    matrix_parser.add_argument(
+        "-r",
+        "--requirements",
+        action="append",
+        help="Requirements file or pyproject.toml to install, can be repeated.",
+    )
+    matrix_parser.add_argument(
+        "run_args",
+        help="Command to run, after a `--`",
+        nargs=argparse.REMAINDER,
+    )
 
     args = parser.parse_args(namespace=YenArgs)
 
     if args.command == "list":
-        versions = list(list_pythons())
+        if args.all:
+            try:
+                release_index = update_release_index(RELEASE_INDEX_PATH)
+            except urllib.error.URLError:
+                print(
+                    "\033[33mWarning: GitHub unreachable. Using cached releases.\033[m",
+                    file=sys.stderr,
+                )
+                release_index = read_release_index(RELEASE_INDEX_PATH)
+            versions = list(release_index["pythons"])
+        else:
+            versions = list(list_pythons())
         print("Available Pythons:", file=sys.stderr)
         for version in versions:
             print(version)
@@ -85,7 +370,46 @@ def cli() -> int:
             " Restart your shell for it to take effect."
         )
 
+    elif args.command == "create" and args.template is not None:
+        if args.python is not None:
+            print(
+                "Error: cannot pass `--python` and `--from` together, the venv"
+                " uses the template's Python.",
+                file=sys.stderr,
+            )
+            return 1
+
+        if os.path.exists(args.venv_path):
+            print(f"\033[1;31mError:\033[m {args.venv_path} already exists.")
+            return 2
+
+        try:
+            python_version, clone_method = create_from_template(
+                args.template, args.venv_path
+            )
+        except NotAvailable:
+            print(
+                "Error: the template's Python version is not available.",
+                file=sys.stderr,
+            )
+            return 1
+        except TemplateError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+
+        print(
+            f"Created \033[1m{args.venv_path}\033[m from template {args.template}"
+            f" with Python {python_version}, using {clone_method}s ✨"
+        )
+
     elif args.command == "create":
+        if args.python is None:
+            print(
+                "Error: pass a Python version, or `--from` a template.",
+                file=sys.stderr,
+            )
+            return 1
+
         try:
             python_version, python_bin_path = ensure_python(args.python)
         except NotAvailable:
@@ -103,7 +427,97 @@ def cli() -> int:
         create_venv(python_bin_path, args.venv_path)
         print(f"Created \033[1m{args.venv_path}\033[m with Python {python_version} ✨")
 
+    elif args.command == "sync":
+        requirements_paths = args.requirements
+        if requirements_paths is None:
+            requirements_paths = [
+                (
+                    "requirements.txt"
+                    if os.path.exists("requirements.txt")
+                    else "pyproject.toml"
+                )
+            ]
+
+        try:
+            result = sync_venv(args.venv_path, args.python, requirements_paths)
+        except NotAvailable:
+            print(
+                "Error: requested Python version is not available."
+                " Use 'yen list' to get list of available Pythons.",
+                file=sys.stderr,
+            )
+            return 1
+        except SyncError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+        except subprocess.CalledProcessError as exc:
+            print(exc.stderr.decode(errors="replace"), file=sys.stderr)
+            return 1
+
+        if result.status == "unchanged":
+            print(f"\033[1m{args.venv_path}\033[m is up to date.")
+        else:
+            print(
+                f"{result.status.capitalize()} \033[1m{args.venv_path}\033[m:"
+                f" {len(result.added)} added, {len(result.removed)} removed ✨"
+            )
+
+    elif args.command == "install" and args.lockfile is not None:
+        try:
+            lockfile = read_lockfile(args.lockfile)
+            locked_tools = lockfile["tools"]
+            if args.package_name is not None:
+                locked_tools = {args.package_name: locked_tools[args.package_name]}
+        except KeyError:
+            print(
+                f"Error: package {args.package_name} is not in {args.lockfile}.",
+                file=sys.stderr,
+            )
+            return 1
+        except LockError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+
+        for package_name, locked_tool in locked_tools.items():
+            try:
+                _, already_installed = install_locked_tool(
+                    package_name,
+                    locked_tool,
+                    force_reinstall=args.force_reinstall,
+                )
+            except NotAvailable:
+                print(
+                    f"Error: Python {locked_tool['python']['version']} locked for"
+                    f" {package_name} is not available.",
+                    file=sys.stderr,
+                )
+                return 1
+            except ExecutableDoesNotExist:
+                print(
+                    f"Error: package {package_name} doesn't contain a binary named"
+                    f" {locked_tool['executable_name']}.",
+                    file=sys.stderr,
+                )
+                return 4
+
+            if already_installed:
+                print(f"Package \033[1m{package_name}\033[m is already installed.")
+            else:
+                print(
+                    f"Installed package \033[1m{package_name}\033[m"
+                    f" from {args.lockfile} ✨"
+                )
+
+        check_path(PACKAGE_INSTALLS_PATH)
+
     elif args.command == "install":
+        if args.package_name is None:
+            print(
+                "Error: pass a package name, or `--lockfile` to install from.",
+                file=sys.stderr,
+            )
+            return 1
+
         if args.module is not None and args.binary is not None:
             print(
                 "Error: cannot pass `--binary` and `--module` together.",
@@ -131,7 +545,12 @@ def cli() -> int:
                 executable_name,
                 is_module=is_module,
                 force_reinstall=args.force_reinstall,
+                shim=args.shim,
+                installer=args.installer,
             )
+        except InstallerError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
         except ExecutableDoesNotExist:
             error_message = (
                 f"Error: package {args.package_name} doesn't contain a binary named"
@@ -152,9 +571,195 @@ def cli() -> int:
 
         check_path(PACKAGE_INSTALLS_PATH)
 
-    elif args.command == "run":
+    elif args.command == "lock":
+        try:
+            lockfile = create_lockfile(args.package_names)
+        except LockError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+
+        write_lockfile(lockfile, args.output)
+        print(
+            f"Locked {len(lockfile['tools'])} tool(s) into \033[1m{args.output}\033[m ✨"
+        )
+
+    elif args.command == "upgrade":
+        if args.all:
+            package_names = list_installed_tools()
+        elif args.package_names:
+            package_names = args.package_names
+        else:
+            print("Error: pass package names to upgrade, or `--all`.", file=sys.stderr)
+            return 1
+
+        installed_tools = list_installed_tools()
+        for package_name in package_names:
+            if package_name not in installed_tools:
+                print(
+                    f"Error: package {package_name} is not installed.",
+                    file=sys.stderr,
+                )
+                return 1
+
+        try:
+            outdated_packages = find_outdated_packages(package_names)
+        except PackageNotFound as exc:
+            print(f"Error: package {exc} was not found on PyPI.", file=sys.stderr)
+            return 1
+        except urllib.error.URLError as exc:
+            print(f"Error: could not reach PyPI: {exc.reason}.", file=sys.stderr)
+            return 1
+
+        for package_name in package_names:
+            if package_name not in outdated_packages:
+                print(f"Package \033[1m{package_name}\033[m is up to date.")
+                continue
+
+            installed_version, newest_version = outdated_packages[package_name]
+            try:
+                upgraded_version = upgrade_package(package_name)
+            except InstallerError as exc:
+                print(f"Error: {exc}.", file=sys.stderr)
+                return 1
+            except subprocess.CalledProcessError as exc:
+                print(exc.stderr.decode(errors="replace"), file=sys.stderr)
+                return 1
+            except ExecutableDoesNotExist:
+                print(
+                    f"Error: package {package_name} no longer contains its binary.",
+                    file=sys.stderr,
+                )
+                return 4
+
+            # The newest release may not support the tool's Python, for one.
+            if upgraded_version == installed_version:
+                print(
+                    f"\033[33mWarning: package {package_name} is still at"
+                    f" {installed_version}, {newest_version} could not be"
+                    " installed.\033[m",
+                    file=sys.stderr,
+                )
+                continue
+
+            print(
+                f"Upgraded package \033[1m{package_name}\033[m"
+                f" from {installed_version} to {upgraded_version} ✨"
+            )
+
+    elif args.command == "uninstall":
+        if args.package_name not in list_installed_tools():
+            print(
+                f"Error: package {args.package_name} is not installed.",
+                file=sys.stderr,
+            )
+            return 1
+
+        uninstall_package(args.package_name)
+        print(f"Uninstalled package \033[1m{args.package_name}\033[m")
+
+    elif args.command == "du":
+        usage = disk_usage()
+        print("Pythons:")
+        for python in usage.pythons:
+            used_by = ", ".join(python.tools) or "no tools"
+            if python.is_incomplete:
+                used_by = "incomplete install"
+            print(f"  {python.version:<12} {format_size(python.size):>10}  ({used_by})")
+
+        print("Tools:")
+        for tool in usage.tools:
+            print(
+                f"  {tool.package_name:<24} {format_size(tool.size):>10}"
+                f"  (Python {tool.python_version or 'unknown'})"
+            )
+
+        print(f"Total: {format_size(usage.total_size)}")
+
+    elif args.command == "prune":
+        if args.pythons:
+            print(
+                "\033[33mWarning: venvs made with `yen create`, `yen sync` or"
+                " `yen matrix` stop working if their Python is removed.\033[m",
+                file=sys.stderr,
+            )
+
+        removed_paths = prune(
+            older_than_days=args.older_than,
+            keep_tools=args.keep,
+            prune_pythons=args.pythons,
+            dry_run=args.dry_run,
+        )
+        for removed_path in removed_paths:
+            print(f"{'Would remove' if args.dry_run else 'Removed'} {removed_path}")
+
+        if not removed_paths:
+            print("Nothing to prune.")
+
+    elif args.command == "verify":
+        has_damage = False
+        for check in verify_installs():
+            label = "Python" if check.kind == "python" else "Package"
+            if check.damaged is None:
+                print(f"{label} \033[1m{check.name}\033[m has no manifest, skipped.")
+                continue
+
+            if not check.damaged:
+                print(f"{label} \033[1m{check.name}\033[m is intact.")
+                continue
+
+            print(
+                f"{label} \033[1m{check.name}\033[m has"
+                f" {len(check.damaged)} damaged file(s):"
+            )
+            for damaged_path in check.damaged[:10]:
+                print(f"  {damaged_path}")
+            if len(check.damaged) > 10:
+                print(f"  ... and {len(check.damaged) - 10} more")
+
+            if not args.repair:
+                has_damage = True
+            elif check.kind == "python":
+                repair_python(check.name)
+                print(f"Repaired Python \033[1m{check.name}\033[m ✨")
+            else:
+                repair_tool(check.name, check.damaged)
+                print(f"Repaired package \033[1m{check.name}\033[m ✨")
+
+        if has_damage:
+            print("Run `yen verify --repair` to fix them.", file=sys.stderr)
+            return 1
+
+    elif args.command == "template" and args.template_command == "save":
+        try:
+            template_metadata = save_template(args.template_name, args.venv_path)
+        except TemplateError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+
+        print(
+            f"Saved \033[1m{args.venv_path}\033[m as template"
+            f" {args.template_name}, with Python"
+            f" {template_metadata['python_version']} ✨"
+        )
+
+    elif args.command == "template" and args.template_command == "list":
+        for template_name in list_templates():
+            print(template_name)
+
+    elif args.command == "template" and args.template_command == "remove":
         try:
-            _, python_bin_path = ensure_python(args.python)
+            remove_template(args.template_name)
+        except TemplateError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+
+        print(f"Removed template \033[1m{args.template_name}\033[m")
+
+    elif args.command == "python" and args.python_command == "upgrade":
+        try:
+            python_version, migrated_venvs, removed_versions = upgrade_python(
+                args.python_version, remove_old=args.remove_old
+            )
         except NotAvailable:
             print(
                 "Error: requested Python version is not available."
@@ -163,26 +768,72 @@ def cli() -> int:
             )
             return 1
 
-        # TODO: add yaspin?
+        print(f"Python \033[1m{python_version}\033[m is installed ✨")
+        for venv_path in migrated_venvs:
+            print(f"Moved {venv_path} to Python {python_version}")
+        for removed_version in removed_versions:
+            print(f"Removed Python {removed_version}")
+
+    elif args.command == "run":
+        tool_name = requirement_name(args.package_name)
+        if tool_name is None:
+            print(f"Error: {args.package_name} is not a package name.", file=sys.stderr)
+            return 1
+
+        is_bare_name = tool_name == args.package_name
+        if is_bare_name and args.python is None and tool_name in list_installed_tools():
+            shim_path, venv_path = tool_paths(tool_name)
+            record_usage(venv_path)
+            return subprocess.call([shim_path, *args.run_args])
+
         try:
-            shim_path, _ = install_package(
-                args.package_name,
-                python_bin_path,
-                executable_name=args.package_name,
+            python_version, python_bin_path = ensure_python(
+                args.python or DEFAULT_PYTHON_VERSION
             )
-        except ExecutableDoesNotExist:
+        except NotAvailable:
             print(
-                f"Error: package {args.package_name} doesn't contain a binary named"
-                f" {args.package_name}.",
+                "Error: requested Python version is not available."
+                " Use 'yen list' to get list of available Pythons.",
+                file=sys.stderr,
+            )
+            return 1
+
+        # TODO: add yaspin?
+        venv_path = ensure_cached_venv(
+            RUN_CACHE_PATH,
+            [args.package_name, python_version],
+            python_bin_path,
+            [args.package_name],
+        )
+        executable_path = venv_binary_path(tool_name, venv_path)
+        if not os.path.exists(executable_path):
+            print(
+                f"Error: package {tool_name} doesn't contain a binary named"
+                f" {tool_name}.",
                 file=sys.stderr,
             )
             return 4
 
-        return subprocess.call([shim_path, *args.run_args])
+        return subprocess.call([executable_path, *args.run_args])
 
     elif args.command == "exec":
+        dependencies: list[str] = []
+        requires_python: str | None = None
         try:
-            python_version, python_bin_path = ensure_python(args.python)
+            if args.script is not None:
+                script_metadata = read_script_metadata(args.script)
+                dependencies = sorted(script_metadata["dependencies"])
+                requires_python = script_metadata["requires_python"]
+                if args.python is not None:
+                    python_request = args.python
+                elif requires_python is not None:
+                    python_request = pick_python_version(requires_python)
+                else:
+                    python_request = DEFAULT_PYTHON_VERSION
+            else:
+                python_request = args.python or DEFAULT_PYTHON_VERSION
+
+            python_version, python_bin_path = ensure_python(python_request)
         except NotAvailable:
             print(
                 "Error: requested Python version is not available."
@@ -190,7 +841,77 @@ def cli() -> int:
                 file=sys.stderr,
             )
             return 1
+        except (OSError, ScriptError) as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
 
-        return subprocess.call([python_bin_path])
+        if args.script is None:
+            return subprocess.call([python_bin_path])
+
+        if requires_python is not None and not python_satisfies(
+            python_version, requires_python
+        ):
+            print(
+                f"\033[33mWarning: {args.script} requires Python {requires_python},"
+                f" running it with {python_version}.\033[m",
+                file=sys.stderr,
+            )
+
+        if dependencies:
+            venv_path = ensure_cached_venv(
+                EXEC_CACHE_PATH,
+                [python_version, *dependencies],
+                python_bin_path,
+                dependencies,
+            )
+            python_bin_path = venv_binary_path("python", venv_path)
+
+        return subprocess.call([python_bin_path, args.script, *args.run_args])
+
+    elif args.command == "matrix":
+        command = args.run_args
+        if command[:1] == ["--"]:
+            command = command[1:]
+        if not command:
+            print("Error: pass a command to run, after a `--`.", file=sys.stderr)
+            return 1
+
+        requested_pythons = [
+            version.strip() for version in args.python.split(",") if version.strip()
+        ]
+        try:
+            matrix_venvs = prepare_venvs(requested_pythons, args.requirements or [])
+        except NotAvailable:
+            print(
+                "Error: requested Python version is not available."
+                " Use 'yen list' to get list of available Pythons.",
+                file=sys.stderr,
+            )
+            return 1
+        except SyncError as exc:
+            print(f"Error: {exc}.", file=sys.stderr)
+            return 1
+        except subprocess.CalledProcessError as exc:
+            print(exc.stderr.decode(errors="replace"), file=sys.stderr)
+            return 1
+
+        start_time = time.monotonic()
+        results = run_matrix(matrix_venvs, command, jobs=args.jobs)
+        total_duration = time.monotonic() - start_time
+
+        print()
+        for matrix_result in results:
+            if matrix_result.returncode == 0:
+                status = "\033[32mpassed\033[m"
+            else:
+                status = f"\033[31mfailed (exit code {matrix_result.returncode})\033[m"
+            print(
+                f"Python \033[1m{matrix_result.python_version:<10}\033[m {status}"
+                f" in {matrix_result.duration:.1f}s"
+            )
+
+        print(f"Ran on {len(results)} Python(s) in {total_duration:.1f}s")
+        if any(matrix_result.returncode != 0 for matrix_result in results):
+            return 1
 
     return 0
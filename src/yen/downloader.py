@@ -3,10 +3,13 @@
 from __future__ import annotations
 
 from http.client import HTTPResponse
+import json
+import os
 import os.path
 import signal
-from functools import partial
-from threading import Event
+import sys
+import time
+from threading import Event, Lock
 from urllib.request import urlopen
 
 from rich.progress import (
@@ -18,7 +21,6 @@ from rich.progress import (
     TransferSpeedColumn,
 )
 
-
 PROGRESS = Progress(
     TextColumn("[bold blue]{task.fields[display_name]}"),
     BarColumn(bar_width=None),
@@ -31,8 +33,22 @@ PROGRESS = Progress(
     TimeRemainingColumn(),
 )
 
+# Reads start small, and grow as long as the connection keeps filling them.
+INITIAL_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# Progress is reported at most this often, in seconds.
+PROGRESS_REFRESH_INTERVAL = 0.1
+JSON_PROGRESS_REFRESH_INTERVAL = 1.0
+
+# One of "rich", "json" or "quiet". Defaults to a progress bar in a terminal,
+# and to JSON lines on stderr otherwise, eg. in CI logs.
+PROGRESS_MODE = os.getenv("YEN_PROGRESS") or ("rich" if sys.stdout.isatty() else "json")
+
 
 DONE = Event()
+# Downloads can run in parallel, and share the one progress display.
+PROGRESS_LOCK = Lock()
+active_downloads = 0
 
 
 def handle_sigint(_: object, __: object) -> None:
@@ -42,26 +58,85 @@ def handle_sigint(_: object, __: object) -> None:
 signal.signal(signal.SIGINT, handle_sigint)
 
 
+def _start_progress() -> None:
+    global active_downloads
+    with PROGRESS_LOCK:
+        if active_downloads == 0:
+            PROGRESS.start()
+        active_downloads += 1
+
+
+def _stop_progress() -> None:
+    global active_downloads
+    with PROGRESS_LOCK:
+        active_downloads -= 1
+        if active_downloads == 0:
+            PROGRESS.stop()
+
+
 def read_url(url: str) -> str:
     """Reads the contents of the URL."""
     response: HTTPResponse = urlopen(url)
     return response.read().decode()
 
 
+def _print_json_progress(display_name: str, downloaded: int, total: int | None) -> None:
+    progress = {"event": "download", "name": display_name, "downloaded": downloaded}
+    if total is not None:
+        progress["total"] = total
+
+    print(json.dumps(progress), file=sys.stderr, flush=True)
+
+
 def download(url: str, display_name: str, directory: str) -> str:
     """Downloads file to the given directory. Returns path to downloaded file."""
-    with PROGRESS:
-        filename = url.split("/")[-1]
-        filepath = os.path.join(directory, filename)
-        task_id = PROGRESS.add_task("download", display_name=display_name, start=False)
-        response = urlopen(url)
-
-        # This will break if the response doesn't contain content length
-        PROGRESS.update(task_id, total=int(response.info()["Content-length"]))
+    filename = url.split("/")[-1]
+    filepath = os.path.join(directory, filename)
+    response: HTTPResponse = urlopen(url)
+    content_length = response.info()["Content-length"]
+    total = int(content_length) if content_length is not None else None
+
+    if PROGRESS_MODE == "rich":
+        _start_progress()
+        task_id = PROGRESS.add_task("download", display_name=display_name, total=total)
+
+    def report_progress(downloaded: int) -> None:
+        if PROGRESS_MODE == "rich":
+            PROGRESS.update(task_id, completed=downloaded)
+        elif PROGRESS_MODE == "json":
+            _print_json_progress(display_name, downloaded, total)
+
+    refresh_interval = (
+        PROGRESS_REFRESH_INTERVAL
+        if PROGRESS_MODE == "rich"
+        else JSON_PROGRESS_REFRESH_INTERVAL
+    )
+    # The same buffer is read into and written out of, for every chunk.
+    buffer = memoryview(bytearray(MAX_CHUNK_SIZE))
+    chunk_size = INITIAL_CHUNK_SIZE
+    downloaded = 0
+    last_report_time = time.monotonic()
+    try:
         with open(filepath, "wb") as file:
-            PROGRESS.start_task(task_id)
-            for data in iter(partial(response.read, 32768), b""):
-                file.write(data)
-                PROGRESS.update(task_id, advance=len(data))
+            while True:
+                bytes_read = response.readinto(buffer[:chunk_size])
+                if not bytes_read:
+                    break
+
+                file.write(buffer[:bytes_read])
+                downloaded += bytes_read
+                if bytes_read == chunk_size and chunk_size < MAX_CHUNK_SIZE:
+                    chunk_size *= 2
+
+                now = time.monotonic()
+                if now - last_report_time >= refresh_interval:
+                    report_progress(downloaded)
+                    last_report_time = now
+
+        report_progress(downloaded)
+    finally:
+        if PROGRESS_MODE == "rich":
+            PROGRESS.remove_task(task_id)
+            _stop_progress()
 
     return filepath
@@ -0,0 +1,147 @@
+"""Tarball extraction, with file writes spread across a pool of threads."""
+
+from __future__ import annotations
+
+import fnmatch
+import os
+import os.path
+import tarfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class UnsafeTarMember(Exception):
+    """Raised when a tarball member would end up outside the destination."""
+
+
+def is_excluded(member_name: str, excluded_patterns: list[str]) -> bool:
+    # Lowercased so that the same patterns work for Windows builds, that
+    # have eg. `python/Lib/` instead of `python/lib/`.
+    member_name = member_name.lower()
+    return any(
+        fnmatch.fnmatchcase(member_name, pattern)
+        # Trailing slash, so that `dir/*` patterns match `dir` itself too.
+        or fnmatch.fnmatchcase(member_name + "/", pattern)
+        for pattern in excluded_patterns
+    )
+
+
+def _safe_path(destination: str, member_name: str) -> str:
+    """Returns where the member should be extracted, if it is inside destination."""
+    target_path = os.path.normpath(os.path.join(destination, member_name))
+    if os.path.commonpath([destination, target_path]) != destination:
+        raise UnsafeTarMember(member_name)
+
+    return target_path
+
+
+def _write_file(path: str, data: bytes, mode: int, mtime: float) -> None:
+    with open(path, "wb") as file:
+        file.write(data)
+
+    os.chmod(path, mode)
+    os.utime(path, (mtime, mtime))
+
+
+def _create_symlink(path: str, link_target: str) -> None:
+    if os.path.lexists(path):
+        os.remove(path)
+
+    os.symlink(link_target, path)
+
+
+def extract_tarball(
+    tarball_path: str,
+    destination: str,
+    *,
+    excluded_patterns: list[str] | None = None,
+    max_workers: int | None = None,
+) -> None:
+    """
+    Extracts a `.tar.gz` into destination. Decompression happens sequentially
+    on the calling thread, while creating files, writing them, setting their
+    permissions and creating symlinks is dispatched to a pool of threads.
+
+    With `max_workers=0`, everything happens on the calling thread instead.
+    Directories are created in order on the calling thread before any file in
+    them is written, and hardlinks are created only after all files exist.
+    Members that would be extracted outside destination are rejected.
+    """
+    destination = os.path.realpath(destination)
+    if max_workers is None:
+        cpu_count = os.cpu_count() or 1
+        # With a single CPU, the writer threads only fight decompression for it.
+        max_workers = min(16, cpu_count * 4) if cpu_count > 1 else 0
+
+    created_directories = {destination}
+    directory_members: list[tuple[str, tarfile.TarInfo]] = []
+    hardlinks: list[tuple[str, str]] = []
+    futures: list[Future[None]] = []
+    # Bounds the memory used by file contents waiting to be written.
+    pending_writes = threading.BoundedSemaphore(max(1, max_workers * 8))
+
+    def ensure_directory(path: str) -> None:
+        if path not in created_directories:
+            os.makedirs(path, exist_ok=True)
+            created_directories.add(path)
+
+    def submit(function: Callable[..., None], *args: Any) -> None:
+        if max_workers == 0:
+            function(*args)
+            return
+
+        pending_writes.acquire()
+
+        def run() -> None:
+            try:
+                function(*args)
+            finally:
+                pending_writes.release()
+
+        futures.append(executor.submit(run))
+
+    with tarfile.open(tarball_path, mode="r|gz") as tar, ThreadPoolExecutor(
+        max_workers=max(1, max_workers)
+    ) as executor:
+        for member in tar:
+            if excluded_patterns and is_excluded(member.name, excluded_patterns):
+                continue
+
+            path = _safe_path(destination, member.name)
+            if member.isdir():
+                ensure_directory(path)
+                directory_members.append((path, member))
+                continue
+
+            ensure_directory(os.path.dirname(path))
+            if member.isfile():
+                file_object = tar.extractfile(member)
+                assert file_object is not None
+                submit(_write_file, path, file_object.read(), member.mode, member.mtime)
+
+            elif member.issym():
+                # The link target must stay inside destination as well.
+                link_target = os.path.join(
+                    os.path.dirname(member.name), member.linkname
+                )
+                _safe_path(destination, link_target)
+                submit(_create_symlink, path, member.linkname)
+
+            elif member.islnk():
+                hardlinks.append((_safe_path(destination, member.linkname), path))
+
+            # Device files, fifos etc. are never part of a Python build.
+
+        for future in futures:
+            future.result()
+
+    for link_target, path in hardlinks:
+        if os.path.lexists(path):
+            os.remove(path)
+        os.link(link_target, path)
+
+    # Deepest first, so read-only directories don't block anything inside them.
+    for path, member in reversed(directory_members):
+        os.chmod(path, member.mode)
+        os.utime(path, (member.mtime, member.mtime))
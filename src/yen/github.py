@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import json
+import os
 import os.path
 import platform
 import re
 import sys
+import tempfile
+import threading
 import typing
 import urllib.error
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, TypedDict
 import urllib.parse
-from urllib.request import urlopen
+from urllib.request import Request, urlopen
 
 LAST_TAG_FOR_I686_LINUX = "118809599"  # tag name: "20230826"
 
@@ -45,6 +49,12 @@ GITHUB_API_RELEASES_URL = (
     "https://api.github.com/repos/astral-sh/python-build-standalone/releases/"
 )
 PYTHON_VERSION_REGEX = re.compile(r"cpython-(\d+\.\d+\.\d+)")
+REQUESTED_VERSION_REGEX = re.compile(r"\d+(\.\d+)*")
+GITHUB_LINK_LAST_PAGE_REGEX = re.compile(r'[?&]page=(\d+)>; rel="last"')
+# Held while the release index is updated, by concurrent `yen matrix` setups.
+RELEASE_INDEX_LOCK = threading.Lock()
+# Release data is big, as each release has thousands of assets.
+RELEASES_PER_PAGE = 20
 
 
 class GitHubReleaseData(TypedDict):
@@ -79,6 +89,15 @@ def fallback_release_data() -> GitHubReleaseData:
         return typing.cast(GitHubReleaseData, json.load(data))
 
 
+class ReleaseIndex(TypedDict):
+    """Python versions merged across all GitHub releases, for one platform."""
+
+    platform: str
+    release_ids: list[int]
+    # Each version links to its build in the newest release that has it.
+    pythons: dict[str, str]
+
+
 class NotAvailable(Exception):
     """Raised when the asked Python version is not available."""
 
@@ -102,8 +121,15 @@ def get_latest_python_releases(is_linux_i686: bool) -> GitHubReleaseData:
     return release_data
 
 
-def list_pythons() -> dict[str, str]:
-    """Returns available python versions for your machine and their download links."""
+def platform_key() -> str:
+    system, machine = platform.system(), platform.machine()
+    if system == "Linux":
+        return f"{system}-{machine}-{platform.libc_ver()[0] or 'musl'}"
+
+    return f"{system}-{machine}"
+
+
+def _download_link_suffixes() -> list[str]:
     system, machine = platform.system(), platform.machine()
     download_link_suffixes = MACHINE_SUFFIX[system][machine]
     # linux suffixes are nested under glibc or musl builds
@@ -112,14 +138,19 @@ def list_pythons() -> dict[str, str]:
         libc_version = platform.libc_ver()[0] or "musl"
         download_link_suffixes = download_link_suffixes[libc_version]
 
-    is_linux_i686 = system == "Linux" and machine == "i686"
-    releases = get_latest_python_releases(is_linux_i686)
-    python_releases = [asset["browser_download_url"] for asset in releases["assets"]]
+    return typing.cast("list[str]", download_link_suffixes)
+
+
+def _python_links(release_data: GitHubReleaseData) -> dict[str, str]:
+    """Returns the Python versions in the release for your machine, and their links."""
+    python_releases = [
+        asset["browser_download_url"] for asset in release_data["assets"]
+    ]
 
     available_python_links = [
         link
         # Suffixes are in order of preference.
-        for download_link_suffix in download_link_suffixes
+        for download_link_suffix in _download_link_suffixes()
         for link in python_releases
         if link.endswith(download_link_suffix)
     ]
@@ -135,7 +166,11 @@ def list_pythons() -> dict[str, str]:
 
         python_versions[python_version] = link
 
-    sorted_python_versions = {
+    return python_versions
+
+
+def _sorted_by_version(python_versions: dict[str, str]) -> dict[str, str]:
+    return {
         version: python_versions[version]
         for version in sorted(
             python_versions,
@@ -144,31 +179,177 @@ def list_pythons() -> dict[str, str]:
             reverse=True,
         )
     }
-    return sorted_python_versions
 
 
-def _parse_python_version(version: str) -> tuple[int, ...]:
+def list_pythons() -> dict[str, str]:
+    """Returns available python versions for your machine and their download links."""
+    system, machine = platform.system(), platform.machine()
+    is_linux_i686 = system == "Linux" and machine == "i686"
+    releases = get_latest_python_releases(is_linux_i686)
+    return _sorted_by_version(_python_links(releases))
+
+
+def _fetch_releases_page(page: int) -> tuple[list[GitHubReleaseData], int]:
+    """Returns one page of releases, newest first, and the number of pages."""
+    url = urllib.parse.urljoin(
+        GITHUB_API_RELEASES_URL, f"?per_page={RELEASES_PER_PAGE}&page={page}"
+    )
+    request = Request(url, headers={"Accept": "application/vnd.github+json"})
+    github_token = os.getenv("GITHUB_TOKEN")
+    if github_token:
+        request.add_header("Authorization", f"Bearer {github_token}")
+
+    with urlopen(request) as response:
+        releases = [
+            trim_github_release_data(release_data)
+            for release_data in json.load(response)
+        ]
+        last_page_match = GITHUB_LINK_LAST_PAGE_REGEX.search(
+            response.headers.get("Link", "")
+        )
+
+    page_count = int(last_page_match[1]) if last_page_match else page
+    return releases, page_count
+
+
+def read_release_index(index_path: str) -> ReleaseIndex:
+    """Returns the locally cached release index, or an empty one."""
+    if os.path.exists(index_path):
+        with open(index_path) as index_file:
+            index = typing.cast(ReleaseIndex, json.load(index_file))
+
+        if index["platform"] == platform_key():
+            return index
+
+    return {"platform": platform_key(), "release_ids": [], "pythons": {}}
+
+
+def update_release_index(index_path: str) -> ReleaseIndex:
+    """
+    Fetches the releases that aren't in the cached release index yet, and
+    merges them in. The first time, all pages of releases are fetched in
+    parallel. After that, usually only the first page needs to be fetched.
+    """
+    with RELEASE_INDEX_LOCK:
+        return _update_release_index(index_path)
+
+
+def _update_release_index(index_path: str) -> ReleaseIndex:
+    index = read_release_index(index_path)
+    known_release_ids = set(index["release_ids"])
+
+    releases, page_count = _fetch_releases_page(1)
+    if not known_release_ids and page_count > 1:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for page_releases, _ in executor.map(
+                _fetch_releases_page, range(2, page_count + 1)
+            ):
+                releases += page_releases
+    else:
+        page = 1
+        while page < page_count and not any(
+            release["id"] in known_release_ids for release in releases
+        ):
+            page += 1
+            page_releases, _ = _fetch_releases_page(page)
+            releases += page_releases
+
+    new_releases = [
+        release for release in releases if release["id"] not in known_release_ids
+    ]
+    # Going from oldest to newest, so that newer builds of a version win.
+    for release in reversed(new_releases):
+        index["pythons"].update(_python_links(release))
+        index["release_ids"].append(release["id"])
+
+    index["pythons"] = _sorted_by_version(index["pythons"])
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    # A temporary file of its own, in case another yen process is updating too.
+    file_descriptor, temporary_path = tempfile.mkstemp(
+        dir=os.path.dirname(index_path), suffix=".tmp"
+    )
+    with os.fdopen(file_descriptor, "w") as index_file:
+        json.dump(index, index_file)
+    os.replace(temporary_path, index_path)
+
+    return index
+
+
+def python_version_matches(version: str, requested_version: str) -> bool:
+    """
+    Checks if the version is the requested one, matching whole components:
+    "3.12" matches "3.12.1", but not "3.1" or "3.121.0", and "3.12.1" only
+    matches itself.
+    """
+    requested_parts = requested_version.split(".")
+    return version.split(".")[: len(requested_parts)] == requested_parts
+
+
+def _find_version(
+    pythons: dict[str, str], requested_version: str
+) -> tuple[str, str] | None:
+    for version, version_download_link in pythons.items():
+        if python_version_matches(version, requested_version):
+            return version, version_download_link
+
+    return None
+
+
+def parse_python_version(version: str) -> tuple[int, ...]:
     return tuple(int(k) for k in version.split("."))
 
 
-def resolve_python_version(requested_version: str | None) -> tuple[str, str]:
+def resolve_python_version(
+    requested_version: str | None,
+    release_index_path: str | None = None,
+) -> tuple[str, str]:
+    """
+    Returns the newest Python version matching the requested version, and its
+    download link. If the latest release doesn't have it, the release index
+    at `release_index_path` is used, for older versions.
+    """
+    if requested_version is not None and not REQUESTED_VERSION_REGEX.fullmatch(
+        requested_version
+    ):
+        raise NotAvailable
+
+    is_linux_i686 = platform.system() == "Linux" and platform.machine() == "i686"
+    use_release_index = release_index_path is not None and not is_linux_i686
+    if (
+        release_index_path is not None
+        and use_release_index
+        and requested_version is not None
+        and len(parse_python_version(requested_version)) == 3
+    ):
+        # Exact versions can be looked up locally, without any network calls.
+        index = read_release_index(release_index_path)
+        if requested_version in index["pythons"]:
+            return requested_version, index["pythons"][requested_version]
+
     pythons = list_pythons()
 
     if requested_version is None:
         sorted_pythons = sorted(
             pythons.items(),
-            key=lambda version_link: _parse_python_version(version_link[0]),
+            key=lambda version_link: parse_python_version(version_link[0]),
             reverse=True,
         )
         latest_version, download_link = sorted_pythons[0]
         return latest_version, download_link
 
-    for version, version_download_link in pythons.items():
-        if version.startswith(requested_version):
-            python_version = version
-            download_link = version_download_link
-            break
-    else:
+    found_version = _find_version(pythons, requested_version)
+    if found_version is None and release_index_path is not None and use_release_index:
+        index = read_release_index(release_index_path)
+        found_version = _find_version(index["pythons"], requested_version)
+        if found_version is None:
+            try:
+                index = update_release_index(release_index_path)
+            except urllib.error.URLError:
+                raise NotAvailable
+
+            found_version = _find_version(index["pythons"], requested_version)
+
+    if found_version is None:
         raise NotAvailable
 
-    return python_version, download_link
+    return found_version
@@ -0,0 +1,747 @@
+"""
+A wheel installer, for setting up tool venvs without pip. Dependencies are
+resolved from the index's JSON API, one level at a time like pip's legacy
+resolver, without backtracking. Only wheels are supported.
+"""
+
+from __future__ import annotations
+
+import base64
+import configparser
+import csv
+import email.parser
+import hashlib
+import html.parser
+import io
+import json
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import urllib.error
+import urllib.parse
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from email.message import Message
+from typing import NamedTuple
+from urllib.request import Request, urlopen
+
+from yen.pypi import normalize_name
+from yen.specifiers import (
+    InvalidRequirement,
+    Requirement,
+    Version,
+    evaluate_marker,
+    parse_requirement,
+    parse_version,
+    specifier_contains,
+)
+
+SIMPLE_INDEX_URL = os.getenv("YEN_INDEX_URL", "https://pypi.org/simple/")
+# PEP 691, falling back to the HTML pages of PEP 503 that every index serves.
+SIMPLE_JSON_CONTENT_TYPE = "application/vnd.pypi.simple.v1+json"
+SIMPLE_ACCEPT_HEADER = f"{SIMPLE_JSON_CONTENT_TYPE}, text/html;q=0.1"
+INSTALLER_NAME = "yen"
+MAX_WORKERS = 8
+# Run with the target Python, to find out what it can install.
+ENVIRONMENT_SCRIPT = """\
+import json, os, platform, sys, sysconfig
+info = sys.implementation.version
+implementation_version = "{0.major}.{0.minor}.{0.micro}".format(info)
+if info.releaselevel != "final":
+    implementation_version += info.releaselevel[0] + str(info.serial)
+print(json.dumps({
+    "markers": {
+        "implementation_name": sys.implementation.name,
+        "implementation_version": implementation_version,
+        "os_name": os.name,
+        "platform_machine": platform.machine(),
+        "platform_python_implementation": platform.python_implementation(),
+        "platform_release": platform.release(),
+        "platform_system": platform.system(),
+        "platform_version": platform.version(),
+        "python_full_version": platform.python_version(),
+        "python_version": ".".join(platform.python_version_tuple()[:2]),
+        "sys_platform": sys.platform,
+    },
+    "abiflags": getattr(sys, "abiflags", ""),
+    "platform": sysconfig.get_platform(),
+    "libc": platform.libc_ver(),
+    "mac_version": platform.mac_ver()[0],
+    "paths": sysconfig.get_paths(),
+}))
+"""
+CONSOLE_SCRIPT_TEMPLATE = """\
+#!{python_path}
+# -*- coding: utf-8 -*-
+import re
+import sys
+from {module} import {import_name}
+if __name__ == "__main__":
+    sys.argv[0] = re.sub(r"(-script\\.pyw|\\.exe)?$", "", sys.argv[0])
+    sys.exit({function}())
+"""
+LEGACY_MANYLINUX_TAGS = {17: "manylinux2014", 12: "manylinux2010", 5: "manylinux1"}
+
+
+class InstallerError(Exception):
+    """Raised when requirements can't be resolved or installed."""
+
+
+class TargetEnvironment(NamedTuple):
+    python_path: str
+    markers: dict[str, str]
+    # Wheel tags the Python supports, most specific first.
+    tags: list[str]
+    paths: dict[str, str]
+
+
+class IndexFile(NamedTuple):
+    filename: str
+    url: str
+    sha256: str | None
+    requires_python: str | None
+    has_metadata: bool
+    version: Version
+    # Index of the best matching tag in `TargetEnvironment.tags`.
+    tag_priority: int
+
+
+class Candidate(NamedTuple):
+    name: str
+    version: str
+    # None if the installed version is kept.
+    file: IndexFile | None
+    dependencies: list[str]
+
+
+def _platform_tags(platform_name: str, libc: list[str], mac_version: str) -> list[str]:
+    platform_tag = platform_name.replace("-", "_").replace(".", "_")
+    if platform_tag.startswith("linux_"):
+        arch = platform_tag[len("linux_") :]
+        libc_name, libc_version = libc
+        tags = []
+        if libc_name == "glibc":
+            glibc_major, glibc_minor = (int(part) for part in libc_version.split("."))
+            oldest_minor = 5 if arch in ("x86_64", "i686") else 17
+            for minor in range(glibc_minor, oldest_minor - 1, -1):
+                tags.append(f"manylinux_{glibc_major}_{minor}_{arch}")
+                if minor in LEGACY_MANYLINUX_TAGS:
+                    tags.append(f"{LEGACY_MANYLINUX_TAGS[minor]}_{arch}")
+        else:
+            tags += [f"musllinux_1_{minor}_{arch}" for minor in (2, 1, 0)]
+
+        return [*tags, platform_tag]
+
+    if platform_tag.startswith("macosx_"):
+        _, major_string, minor_string, arch = platform_tag.split("_", 3)
+        if mac_version:
+            major_string, minor_string = (mac_version.split(".") + ["0"])[:2]
+
+        macos_major, macos_minor = int(major_string), int(minor_string)
+        arches = [arch, "universal2"]
+        # Since macOS 11, wheels are only tagged with the major version.
+        macos_versions = [(major, 0) for major in range(macos_major, 10, -1)]
+        if arch == "x86_64":
+            arches += ["intel", "fat64", "fat32", "universal"]
+            newest_minor = 16 if macos_major > 10 else macos_minor
+            macos_versions += [(10, minor) for minor in range(newest_minor, 3, -1)]
+
+        return [
+            f"macosx_{major}_{minor}_{tag_arch}"
+            for major, minor in macos_versions
+            for tag_arch in arches
+        ]
+
+    return [platform_tag]
+
+
+def _compatible_tags(
+    python_version: str, abiflags: str, platform_tags: list[str]
+) -> list[str]:
+    """Returns the wheel tags a CPython supports, most specific first."""
+    major, minor = (int(part) for part in python_version.split(".")[:2])
+    interpreter = f"cp{major}{minor}"
+    abis = [f"{interpreter}{abiflags}", "abi3", "none"]
+
+    tags = [f"{interpreter}-{abi}-{plat}" for abi in abis for plat in platform_tags]
+    tags += [
+        f"cp{major}{older_minor}-abi3-{plat}"
+        for older_minor in range(minor - 1, 1, -1)
+        for plat in platform_tags
+    ]
+    tags += [
+        f"py{major}{older_minor}-none-{plat}"
+        for older_minor in range(minor, -1, -1)
+        for plat in platform_tags
+    ]
+    tags += [f"py{major}-none-{plat}" for plat in platform_tags]
+    tags.append(f"{interpreter}-none-any")
+    tags += [f"py{major}{older_minor}-none-any" for older_minor in range(minor, -1, -1)]
+    tags.append(f"py{major}-none-any")
+    return tags
+
+
+def read_target_environment(python_path: str) -> TargetEnvironment:
+    output = subprocess.run(
+        [python_path, "-c", ENVIRONMENT_SCRIPT],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    environment = json.loads(output)
+    markers: dict[str, str] = environment["markers"]
+    platform_tags = _platform_tags(
+        environment["platform"], environment["libc"], environment["mac_version"]
+    )
+    tags = _compatible_tags(
+        markers["python_version"], environment["abiflags"], platform_tags
+    )
+    return TargetEnvironment(python_path, markers, tags, environment["paths"])
+
+
+def _wheel_tags(filename: str) -> tuple[str, str, set[str]] | None:
+    """Returns the name, version and tags in a wheel's filename."""
+    parts = filename[: -len(".whl")].split("-")
+    if len(parts) not in (5, 6):
+        return None
+
+    python_tags, abi_tags, platform_tags = parts[-3:]
+    tags = {
+        f"{python_tag}-{abi_tag}-{platform_tag}"
+        for python_tag in python_tags.split(".")
+        for abi_tag in abi_tags.split(".")
+        for platform_tag in platform_tags.split(".")
+    }
+    return parts[0], parts[1], tags
+
+
+class SimpleHTMLParser(html.parser.HTMLParser):
+    """Reads the files on a PEP 503 project page, like they are in PEP 691."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.files: list[dict[str, object]] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        attributes = dict(attrs)
+        href = attributes.get("href")
+        if tag != "a" or href is None:
+            return
+
+        url, _, fragment = href.partition("#")
+        hash_name, _, hash_value = fragment.partition("=")
+        self.files.append(
+            {
+                "filename": urllib.parse.unquote(url.rsplit("/", 1)[-1]),
+                "url": url,
+                "hashes": {hash_name: hash_value} if hash_value else {},
+                "requires-python": attributes.get("data-requires-python"),
+                "yanked": "data-yanked" in attributes,
+                "core-metadata": attributes.get(
+                    "data-core-metadata", attributes.get("data-dist-info-metadata")
+                ),
+            }
+        )
+
+
+def fetch_project_wheels(
+    package_name: str, tag_priorities: dict[str, int]
+) -> list[IndexFile]:
+    """
+    Returns the best wheel of each version of the package that the target
+    Python can install, newest version first.
+    """
+    project_url = urllib.parse.urljoin(
+        SIMPLE_INDEX_URL, normalize_name(package_name) + "/"
+    )
+    request = Request(project_url, headers={"Accept": SIMPLE_ACCEPT_HEADER})
+    try:
+        with urlopen(request) as response:
+            content_type = response.headers.get("Content-Type", "")
+            content = response.read().decode()
+    except urllib.error.HTTPError as exc:
+        if exc.code == 404:
+            raise InstallerError(f"package {package_name} was not found") from exc
+        raise
+
+    if content_type.startswith(SIMPLE_JSON_CONTENT_TYPE):
+        files = json.loads(content)["files"]
+    else:
+        parser = SimpleHTMLParser()
+        parser.feed(content)
+        files = parser.files
+
+    best_files: dict[tuple[object, ...], IndexFile] = {}
+    for file in files:
+        filename: str = file["filename"]
+        if not filename.endswith(".whl") or file.get("yanked"):
+            continue
+
+        wheel_tags = _wheel_tags(filename)
+        if wheel_tags is None:
+            continue
+
+        _, version_string, tags = wheel_tags
+        priorities = [tag_priorities[tag] for tag in tags if tag in tag_priorities]
+        version = parse_version(version_string)
+        if not priorities or version is None:
+            continue
+
+        index_file = IndexFile(
+            filename=filename,
+            url=urllib.parse.urljoin(project_url, file["url"]),
+            sha256=file.get("hashes", {}).get("sha256"),
+            requires_python=file.get("requires-python"),
+            # Served separately as described in PEP 658
+            has_metadata=bool(
+                file.get("core-metadata") or file.get("dist-info-metadata")
+            ),
+            version=version,
+            tag_priority=min(priorities),
+        )
+        sort_key = version.sort_key()
+        if (
+            sort_key not in best_files
+            or index_file.tag_priority < best_files[sort_key].tag_priority
+        ):
+            best_files[sort_key] = index_file
+
+    return [best_files[key] for key in sorted(best_files, reverse=True)]
+
+
+def _pick_file(
+    requirement_string: str,
+    files: list[IndexFile],
+    specifier: str,
+    python_version: Version,
+) -> IndexFile:
+    """Returns the newest wheel matching the specifier and the Python version."""
+    # Pre-releases are only picked if no final release matches.
+    for prereleases in (False, True):
+        for file in files:
+            if not specifier_contains(specifier, file.version, prereleases=prereleases):
+                continue
+
+            if file.requires_python:
+                try:
+                    if not specifier_contains(
+                        file.requires_python, python_version, prereleases=True
+                    ):
+                        continue
+                except InvalidRequirement:
+                    pass  # Some old releases have invalid ones, like `>=3.6.*`
+
+            return file
+
+    raise InstallerError(f"no compatible wheel found for {requirement_string}")
+
+
+def download_wheel(file: IndexFile, wheel_cache_path: str) -> str:
+    """Downloads the wheel into the cache, unless it is there already."""
+    cache_key = file.sha256 or hashlib.sha256(file.url.encode()).hexdigest()
+    wheel_directory = os.path.join(wheel_cache_path, cache_key[:2], cache_key)
+    wheel_path = os.path.join(wheel_directory, file.filename)
+    if os.path.exists(wheel_path):
+        return wheel_path
+
+    os.makedirs(wheel_directory, exist_ok=True)
+    digest = hashlib.sha256()
+    with urlopen(file.url) as response, tempfile.NamedTemporaryFile(
+        dir=wheel_directory, delete=False
+    ) as temporary_file:
+        for chunk in iter(lambda: response.read(1024 * 1024), b""):
+            digest.update(chunk)
+            temporary_file.write(chunk)
+
+    if file.sha256 is not None and digest.hexdigest() != file.sha256:
+        os.remove(temporary_file.name)
+        raise InstallerError(f"checksum of {file.filename} did not match")
+
+    os.replace(temporary_file.name, wheel_path)
+    return wheel_path
+
+
+def _parse_metadata(metadata: str) -> Message:
+    return email.parser.HeaderParser().parsestr(metadata)
+
+
+def _dist_info_name(names: list[str]) -> str:
+    for name in names:
+        parts = name.split("/")
+        if len(parts) == 2 and parts[0].endswith(".dist-info") and parts[1] == "WHEEL":
+            return parts[0]
+
+    raise InstallerError("wheel has no .dist-info directory")
+
+
+def _fetch_metadata(file: IndexFile, wheel_cache_path: str) -> Message:
+    if file.has_metadata:
+        with urlopen(file.url.split("#")[0] + ".metadata") as response:
+            return _parse_metadata(response.read().decode())
+
+    # The index doesn't serve metadata separately, it's inside the wheel.
+    with zipfile.ZipFile(download_wheel(file, wheel_cache_path)) as wheel:
+        dist_info_name = _dist_info_name(wheel.namelist())
+        return _parse_metadata(wheel.read(f"{dist_info_name}/METADATA").decode())
+
+
+def installed_distributions(site_packages_path: str) -> dict[str, tuple[str, str]]:
+    """Returns the version and `.dist-info` folder of each installed package."""
+    distributions: dict[str, tuple[str, str]] = {}
+    if not os.path.isdir(site_packages_path):
+        return distributions
+
+    for file_name in os.listdir(site_packages_path):
+        if file_name.endswith(".dist-info"):
+            name, _, version = file_name[: -len(".dist-info")].rpartition("-")
+            distributions[normalize_name(name)] = (version, file_name)
+
+    return distributions
+
+
+def _active_dependencies(
+    requires_dist: list[str], markers: dict[str, str], extras: set[str]
+) -> list[Requirement]:
+    """Returns the dependencies that apply to this environment and extras."""
+    dependencies = []
+    for requirement_string in requires_dist:
+        requirement = parse_requirement(requirement_string)
+        if requirement.marker is None or any(
+            evaluate_marker(requirement.marker, {**markers, "extra": extra})
+            for extra in ("", *sorted(extras))
+        ):
+            dependencies.append(requirement)
+
+    return dependencies
+
+
+def resolve(
+    requirements: list[str],
+    environment: TargetEnvironment,
+    wheel_cache_path: str,
+    *,
+    upgrade: bool = False,
+) -> dict[str, Candidate]:
+    """
+    Picks a version of every package needed for the requirements. Installed
+    packages that satisfy the requirements are kept, unless upgrading them.
+    Indexes and metadata are fetched in parallel, a level of dependencies at
+    a time. Returns the candidates by their normalized names.
+    """
+    python_version = parse_version(environment.markers["python_full_version"])
+    assert python_version is not None
+    tag_priorities = {tag: index for index, tag in enumerate(environment.tags)}
+    site_packages_path = environment.paths["purelib"]
+    installed = installed_distributions(site_packages_path)
+    upgraded_names = (
+        {normalize_name(parse_requirement(item).name) for item in requirements}
+        if upgrade
+        else set()
+    )
+
+    chosen: dict[str, Candidate] = {}
+    chosen_extras: dict[str, set[str]] = {}
+    projects: dict[str, list[IndexFile]] = {}
+    pending = [parse_requirement(requirement) for requirement in requirements]
+
+    def keeps_installed(name: str, specifier: str) -> bool:
+        if name not in installed or name in upgraded_names:
+            return False
+        installed_version = parse_version(installed[name][0])
+        return installed_version is not None and specifier_contains(
+            specifier, installed_version, prereleases=True
+        )
+
+    def candidate_dependencies(candidate: Candidate) -> list[str]:
+        if candidate.file is None:
+            _, dist_info_name = installed[normalize_name(candidate.name)]
+            metadata_path = os.path.join(site_packages_path, dist_info_name, "METADATA")
+            with open(metadata_path, encoding="utf-8") as metadata_file:
+                metadata = _parse_metadata(metadata_file.read())
+        else:
+            metadata = _fetch_metadata(candidate.file, wheel_cache_path)
+
+        return metadata.get_all("Requires-Dist") or []
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        while pending:
+            specifiers: dict[str, list[str]] = {}
+            for requirement in pending:
+                name = normalize_name(requirement.name)
+                specifiers.setdefault(name, []).append(requirement.specifier)
+
+            combined_specifiers = {
+                name: ",".join(filter(None, name_specifiers))
+                for name, name_specifiers in specifiers.items()
+            }
+            new_names = [
+                name
+                for name, specifier in combined_specifiers.items()
+                if name not in chosen
+                and name not in projects
+                and not keeps_installed(name, specifier)
+            ]
+            fetched_projects = executor.map(
+                lambda name: fetch_project_wheels(name, tag_priorities), new_names
+            )
+            projects.update(zip(new_names, fetched_projects))
+
+            newly_chosen: list[str] = []
+            next_pending: list[Requirement] = []
+            for requirement in pending:
+                name = normalize_name(requirement.name)
+                if name in chosen:
+                    candidate_version = parse_version(chosen[name].version)
+                    assert candidate_version is not None
+                    if not specifier_contains(
+                        requirement.specifier, candidate_version, prereleases=True
+                    ):
+                        raise InstallerError(
+                            f"conflicting requirements for {requirement.name}:"
+                            f" {requirement.specifier} and {chosen[name].version}"
+                        )
+
+                    new_extras = set(requirement.extras) - chosen_extras[name]
+                    chosen_extras[name] |= new_extras
+                    if new_extras and name not in newly_chosen:
+                        # Only the dependencies of the added extras are new.
+                        next_pending += _active_dependencies(
+                            chosen[name].dependencies,
+                            environment.markers,
+                            new_extras,
+                        )
+                    continue
+
+                specifier = combined_specifiers[name]
+                chosen_extras[name] = set(requirement.extras)
+                if keeps_installed(name, specifier):
+                    chosen[name] = Candidate(
+                        requirement.name, installed[name][0], None, []
+                    )
+                else:
+                    file = _pick_file(
+                        requirement.name + specifier,
+                        projects[name],
+                        specifier,
+                        python_version,
+                    )
+                    chosen[name] = Candidate(
+                        requirement.name, str(file.filename.split("-")[1]), file, []
+                    )
+                newly_chosen.append(name)
+
+            all_dependencies = executor.map(
+                lambda name: candidate_dependencies(chosen[name]), newly_chosen
+            )
+            for name, dependencies in zip(newly_chosen, all_dependencies):
+                chosen[name] = chosen[name]._replace(dependencies=dependencies)
+                next_pending += _active_dependencies(
+                    dependencies, environment.markers, chosen_extras[name]
+                )
+
+            pending = next_pending
+
+    return chosen
+
+
+def _record_hash(data: bytes) -> str:
+    digest = hashlib.sha256(data).digest()
+    return "sha256=" + base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _write_file(path: str, data: bytes, is_executable: bool) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as file:
+        file.write(data)
+
+    if is_executable:
+        os.chmod(path, 0o755)
+
+
+def install_wheel(
+    wheel_path: str,
+    environment: TargetEnvironment,
+    *,
+    is_requested: bool = False,
+) -> None:
+    """
+    Unpacks the wheel into the environment's site-packages, as described in
+    PEP 427, generates its console scripts, and writes its `RECORD`.
+    """
+    paths = environment.paths
+    python_shebang = b"#!" + os.fsencode(environment.python_path)
+
+    with zipfile.ZipFile(wheel_path) as wheel:
+        names = wheel.namelist()
+        dist_info_name = _dist_info_name(names)
+        dist_name = dist_info_name.split("-")[0]
+        scheme = {
+            "purelib": paths["purelib"],
+            "platlib": paths["platlib"],
+            "scripts": paths["scripts"],
+            "data": paths["data"],
+            # Like pip does in venvs, as the "include" path is the base Python's.
+            "headers": os.path.join(
+                paths["data"],
+                "include",
+                "site",
+                f"python{environment.markers['python_version']}",
+                dist_name,
+            ),
+        }
+        data_folder_name = dist_info_name[: -len(".dist-info")] + ".data"
+        wheel_metadata = _parse_metadata(wheel.read(f"{dist_info_name}/WHEEL").decode())
+        is_purelib = wheel_metadata.get("Root-Is-Purelib", "").lower() == "true"
+        root_path = scheme["purelib"] if is_purelib else scheme["platlib"]
+
+        records: list[tuple[str, str, str]] = []
+
+        def install_file(path: str, data: bytes, is_executable: bool) -> None:
+            _write_file(path, data, is_executable)
+            records.append(
+                (os.path.relpath(path, root_path), _record_hash(data), str(len(data)))
+            )
+
+        for info in wheel.infolist():
+            if info.is_dir() or info.filename == f"{dist_info_name}/RECORD":
+                continue
+
+            scheme_key = None
+            if info.filename.startswith(data_folder_name + "/"):
+                _, scheme_key, relative_path = info.filename.split("/", 2)
+                target_root = scheme[scheme_key]
+            else:
+                target_root, relative_path = root_path, info.filename
+
+            target_path = os.path.normpath(os.path.join(target_root, relative_path))
+            if os.path.commonpath([target_root, target_path]) != target_root:
+                raise InstallerError(f"unsafe path in wheel: {info.filename}")
+
+            data = wheel.read(info)
+            is_executable = bool((info.external_attr >> 16) & 0o111)
+            if scheme_key == "scripts":
+                first_line, newline, rest = data.partition(b"\n")
+                if first_line.rstrip() in (b"#!python", b"#!pythonw"):
+                    data = python_shebang + newline + rest
+                is_executable = True
+
+            install_file(target_path, data, is_executable)
+
+        entry_points = configparser.ConfigParser(delimiters=("=",))
+        entry_points.optionxform = str  # type: ignore[assignment,method-assign]
+        if f"{dist_info_name}/entry_points.txt" in names:
+            entry_points.read_string(
+                wheel.read(f"{dist_info_name}/entry_points.txt").decode()
+            )
+
+    for section in ("console_scripts", "gui_scripts"):
+        if not entry_points.has_section(section):
+            continue
+
+        for script_name, object_reference in entry_points.items(section):
+            module, _, qualified_name = object_reference.split("[")[0].partition(":")
+            if not qualified_name:
+                continue
+
+            script = CONSOLE_SCRIPT_TEMPLATE.format(
+                python_path=environment.python_path,
+                module=module.strip(),
+                import_name=qualified_name.strip().split(".")[0],
+                function=qualified_name.strip(),
+            )
+            script_path = os.path.join(scheme["scripts"], script_name)
+            install_file(script_path, script.encode(), is_executable=True)
+
+    dist_info_path = os.path.join(root_path, dist_info_name)
+    install_file(
+        os.path.join(dist_info_path, "INSTALLER"),
+        f"{INSTALLER_NAME}\n".encode(),
+        is_executable=False,
+    )
+    if is_requested:
+        install_file(os.path.join(dist_info_path, "REQUESTED"), b"", False)
+
+    record_path = os.path.join(dist_info_path, "RECORD")
+    with open(record_path, "w", newline="") as record_file:
+        writer = csv.writer(record_file, lineterminator="\n")
+        writer.writerows(records)
+        writer.writerow((os.path.relpath(record_path, root_path), "", ""))
+
+
+def uninstall_distribution(site_packages_path: str, dist_info_name: str) -> None:
+    """Removes all files listed in the distribution's `RECORD`."""
+    record_path = os.path.join(site_packages_path, dist_info_name, "RECORD")
+    with open(record_path, newline="") as record_file:
+        recorded_paths = [row[0] for row in csv.reader(io.StringIO(record_file.read()))]
+
+    parent_paths = set()
+    for recorded_path in recorded_paths:
+        path = os.path.normpath(os.path.join(site_packages_path, recorded_path))
+        if os.path.isfile(path) or os.path.islink(path):
+            os.remove(path)
+        parent_paths.add(os.path.dirname(path))
+
+    for parent_path in sorted(parent_paths, key=len, reverse=True):
+        shutil.rmtree(os.path.join(parent_path, "__pycache__"), ignore_errors=True)
+        if os.path.isdir(parent_path) and not os.listdir(parent_path):
+            os.removedirs(parent_path)
+
+    shutil.rmtree(os.path.join(site_packages_path, dist_info_name), ignore_errors=True)
+
+
+def install_requirements(
+    python_path: str,
+    requirements: list[str],
+    wheel_cache_path: str,
+    *,
+    upgrade: bool = False,
+) -> list[str]:
+    """
+    Installs the requirements into the environment of `python_path`, usually
+    a venv. Wheels are downloaded in parallel into `wheel_cache_path`, and
+    unpacked in parallel. Returns the packages that were (re)installed.
+    """
+    environment = read_target_environment(python_path)
+    site_packages_path = environment.paths["purelib"]
+    resolution = resolve(requirements, environment, wheel_cache_path, upgrade=upgrade)
+    installed = installed_distributions(site_packages_path)
+    requested_names = {
+        normalize_name(parse_requirement(requirement).name)
+        for requirement in requirements
+    }
+
+    to_install = {
+        name: candidate
+        for name, candidate in resolution.items()
+        if candidate.file is not None
+        and (name not in installed or installed[name][0] != candidate.version)
+    }
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        wheel_paths = list(
+            executor.map(
+                lambda candidate: download_wheel(candidate.file, wheel_cache_path),
+                to_install.values(),
+            )
+        )
+
+        for name in to_install:
+            if name in installed:
+                uninstall_distribution(site_packages_path, installed[name][1])
+
+        futures = [
+            executor.submit(
+                install_wheel,
+                wheel_path,
+                environment,
+                is_requested=name in requested_names,
+            )
+            for name, wheel_path in zip(to_install, wheel_paths)
+        ]
+        for future in futures:
+            future.result()
+
+    return [
+        f"{candidate.name}=={candidate.version}" for candidate in to_install.values()
+    ]
@@ -0,0 +1,226 @@
+"""Lockfiles, for reproducible tool installs."""
+
+from __future__ import annotations
+
+import json
+import os.path
+import subprocess
+import tempfile
+import typing
+from typing import TypedDict
+
+from yen import (
+    download_python,
+    ensure_python,
+    install_package,
+    list_installed_tools,
+    python_directory,
+    read_python_metadata,
+    read_tool_metadata,
+    read_venv_config,
+    tool_paths,
+    venv_binary_path,
+)
+from yen.github import platform_key
+
+LOCKFILE_VERSION = 2
+DEFAULT_LOCKFILE_PATH = "yen.lock"
+
+
+class LockedPython(TypedDict):
+    version: str
+    download_link: str | None
+    checksum: str | None
+
+
+class LockedPackage(TypedDict):
+    name: str
+    version: str
+    hashes: list[str]
+
+
+class LockedTool(TypedDict):
+    python: LockedPython
+    executable_name: str
+    is_module: bool
+    shim: str
+    packages: list[LockedPackage]
+
+
+class Lockfile(TypedDict):
+    version: int
+    # The Python builds and wheels in it are only for this platform.
+    platform: str
+    tools: dict[str, LockedTool]
+
+
+class LockError(Exception):
+    """Raised when a tool can't be locked or installed from a lockfile."""
+
+
+def _lock_python(python_version: str) -> LockedPython:
+    python_metadata = read_python_metadata(python_directory(python_version))
+    if python_metadata is None:
+        return {"version": python_version, "download_link": None, "checksum": None}
+
+    return {
+        "version": python_version,
+        "download_link": python_metadata["download_link"],
+        "checksum": python_metadata["checksum"],
+    }
+
+
+def lock_tool(package_name: str) -> LockedTool:
+    """Records the exact versions and hashes of everything in a tool's venv."""
+    _, venv_path = tool_paths(package_name)
+    if not os.path.isdir(venv_path):
+        raise LockError(f"package {package_name} is not installed")
+
+    tool_metadata = read_tool_metadata(package_name)
+    if tool_metadata["installer"] != "pip":
+        # Locking relies on pip's resolver to find the archive hashes.
+        raise LockError(
+            f"package {package_name} was installed without pip,"
+            " reinstall it with `--installer pip` to lock it"
+        )
+
+    venv_python_path = venv_binary_path("python", venv_path)
+    frozen_requirements = subprocess.run(
+        # Without --all, setuptools and wheel would be left unpinned.
+        [venv_python_path, "-m", "pip", "freeze", "--all"],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        requirements_path = os.path.join(tempdir, "requirements.txt")
+        with open(requirements_path, "w") as requirements_file:
+            requirements_file.write(frozen_requirements)
+
+        # Resolving the pinned requirements again gives us the archive hashes,
+        # without touching the venv.
+        report_output = subprocess.run(
+            [
+                venv_python_path,
+                *("-m", "pip", "install", "--dry-run", "--ignore-installed"),
+                *("--no-deps", "--quiet", "--report", "-"),
+                *("-r", requirements_path),
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    packages: list[LockedPackage] = []
+    for install_item in json.loads(report_output)["install"]:
+        name = install_item["metadata"]["name"]
+        archive_hashes = install_item["download_info"].get("archive_info", {})
+        hashes = [
+            f"{algorithm}:{digest}"
+            for algorithm, digest in archive_hashes.get("hashes", {}).items()
+        ]
+        if not hashes:
+            raise LockError(f"no archive hash available for {name} in {package_name}")
+
+        packages.append(
+            {
+                "name": name,
+                "version": install_item["metadata"]["version"],
+                "hashes": hashes,
+            }
+        )
+
+    python_version = read_venv_config(venv_path)["version"]
+    return {
+        "python": _lock_python(python_version),
+        "executable_name": tool_metadata["executable_name"],
+        "is_module": tool_metadata["is_module"],
+        "shim": tool_metadata["shim"],
+        "packages": sorted(packages, key=lambda package: package["name"].lower()),
+    }
+
+
+def create_lockfile(package_names: list[str] | None = None) -> Lockfile:
+    """Locks the given tools, or all installed tools if none are given."""
+    if not package_names:
+        package_names = list_installed_tools()
+
+    return {
+        "version": LOCKFILE_VERSION,
+        "platform": platform_key(),
+        "tools": {
+            package_name: lock_tool(package_name) for package_name in package_names
+        },
+    }
+
+
+def write_lockfile(lockfile: Lockfile, lockfile_path: str) -> None:
+    with open(lockfile_path, "w") as file:
+        json.dump(lockfile, file, indent=2)
+        file.write("\n")
+
+
+def read_lockfile(lockfile_path: str) -> Lockfile:
+    with open(lockfile_path) as file:
+        lockfile = typing.cast(Lockfile, json.load(file))
+
+    if lockfile.get("version") != LOCKFILE_VERSION:
+        raise LockError(f"unsupported lockfile version in {lockfile_path}")
+
+    if lockfile["platform"] != platform_key():
+        raise LockError(
+            f"{lockfile_path} was locked on {lockfile['platform']},"
+            f" and can't be installed on {platform_key()}"
+        )
+
+    return lockfile
+
+
+def ensure_locked_python(locked_python: LockedPython) -> str:
+    """Returns the locked Python, downloading the exact locked build if needed."""
+    python_version = locked_python["version"]
+    python_folder = python_directory(python_version)
+    if os.path.isdir(python_folder) or locked_python["download_link"] is None:
+        _, python_bin_path = ensure_python(python_version)
+        return python_bin_path
+
+    return download_python(
+        python_version,
+        locked_python["download_link"],
+        expected_checksum=locked_python["checksum"],
+    )
+
+
+def install_locked_tool(
+    package_name: str,
+    locked_tool: LockedTool,
+    *,
+    force_reinstall: bool = False,
+) -> tuple[str, bool]:
+    """
+    Installs a tool exactly as recorded in the lockfile. Dependencies aren't
+    resolved again, every package is installed by its pinned version and hash.
+    """
+    python_bin_path = ensure_locked_python(locked_tool["python"])
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        requirements_path = os.path.join(tempdir, "requirements.txt")
+        with open(requirements_path, "w") as requirements_file:
+            for package in locked_tool["packages"]:
+                hash_options = " ".join(
+                    f"--hash={package_hash}" for package_hash in package["hashes"]
+                )
+                requirements_file.write(
+                    f"{package['name']}=={package['version']} {hash_options}\n"
+                )
+
+        return install_package(
+            package_name,
+            python_bin_path,
+            locked_tool["executable_name"],
+            is_module=locked_tool["is_module"],
+            force_reinstall=force_reinstall,
+            requirements_file=requirements_path,
+            shim=locked_tool["shim"],
+        )
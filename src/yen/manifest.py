@@ -0,0 +1,158 @@
+"""Per-file manifests of installed Pythons and venvs, to detect damaged installs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import os.path
+import typing
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, TypedDict
+
+MANIFEST_FILENAME = "yen_manifest.json"
+# Files that legitimately change after install. `.yen_last_used` is rewritten
+# on every use, and bytecode is regenerated by Python as needed.
+IGNORED_NAMES = {MANIFEST_FILENAME, ".yen_last_used", "__pycache__"}
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class Manifest(TypedDict):
+    # Relative path -> size, modification time in ns, and sha256 of contents.
+    files: dict[str, tuple[int, int, str]]
+    # Relative path -> link target
+    symlinks: dict[str, str]
+
+
+class VerifyResult(NamedTuple):
+    # Relative paths of files that are missing, or whose contents changed.
+    damaged: list[str]
+    # Files whose size or mtime changed, and had to be hashed again.
+    rehashed: int
+
+
+def _default_workers() -> int:
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def _file_entry(path: str) -> tuple[int, int, str]:
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns, hash_file(path)
+
+
+def _walk_tree(directory: str) -> tuple[list[str], dict[str, str]]:
+    """Returns relative paths of all regular files, and all symlinks."""
+    file_paths: list[str] = []
+    symlinks: dict[str, str] = {}
+    for root, dir_names, file_names in os.walk(directory):
+        dir_names[:] = [name for name in dir_names if name not in IGNORED_NAMES]
+        for name in (*dir_names, *file_names):
+            if name in IGNORED_NAMES:
+                continue
+
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, directory)
+            if os.path.islink(path):
+                symlinks[relative_path] = os.readlink(path)
+            elif name in file_names:
+                file_paths.append(relative_path)
+
+    return file_paths, symlinks
+
+
+def read_manifest(directory: str) -> Manifest | None:
+    manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as manifest_file:
+        return typing.cast(Manifest, json.load(manifest_file))
+
+
+def _save_manifest(directory: str, manifest: Manifest) -> None:
+    manifest_path = os.path.join(directory, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w") as manifest_file:
+        json.dump(manifest, manifest_file, separators=(",", ":"))
+
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def write_manifest(directory: str) -> None:
+    """Records the size, mtime and hash of every file in the directory."""
+    file_paths, symlinks = _walk_tree(directory)
+    with ThreadPoolExecutor(max_workers=_default_workers()) as executor:
+        entries = executor.map(
+            _file_entry,
+            [os.path.join(directory, file_path) for file_path in file_paths],
+        )
+        files = dict(zip(file_paths, entries))
+
+    _save_manifest(directory, {"files": files, "symlinks": symlinks})
+
+
+def verify_manifest(directory: str) -> VerifyResult | None:
+    """
+    Checks the directory against its manifest, in parallel. Files whose size
+    and mtime still match are trusted without reading them. Files that only
+    got a new mtime, like after restoring a cache, are hashed once and their
+    new mtime is saved, so the next check can skip them again.
+
+    Returns None if the directory has no manifest.
+    """
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return None
+
+    def check_file(
+        item: tuple[str, tuple[int, int, str]],
+    ) -> tuple[bool, tuple[int, int, str] | None]:
+        """Returns if the file is intact, and its new entry if it was rehashed."""
+        relative_path, (size, mtime_ns, digest) = item
+        path = os.path.join(directory, relative_path)
+        try:
+            stat = os.stat(path)
+            if stat.st_size != size:
+                return False, None
+            if stat.st_mtime_ns == mtime_ns:
+                return True, None
+
+            new_digest = hash_file(path)
+        except OSError:
+            return False, None
+
+        return new_digest == digest, (size, stat.st_mtime_ns, digest)
+
+    file_items = list(manifest["files"].items())
+    with ThreadPoolExecutor(max_workers=_default_workers()) as executor:
+        results = list(executor.map(check_file, file_items))
+
+    damaged: list[str] = []
+    rehashed_entries: dict[str, tuple[int, int, str]] = {}
+    for (relative_path, _), (is_intact, new_entry) in zip(file_items, results):
+        if not is_intact:
+            damaged.append(relative_path)
+        elif new_entry is not None:
+            rehashed_entries[relative_path] = new_entry
+
+    for relative_path, link_target in manifest["symlinks"].items():
+        path = os.path.join(directory, relative_path)
+        if not os.path.islink(path) or os.readlink(path) != link_target:
+            damaged.append(relative_path)
+
+    if rehashed_entries:
+        manifest["files"].update(rehashed_entries)
+        try:
+            _save_manifest(directory, manifest)
+        except OSError:
+            pass  # Not writable, the files just get hashed again next time.
+
+    return VerifyResult(sorted(damaged), len(rehashed_entries))
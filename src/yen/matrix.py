@@ -0,0 +1,138 @@
+"""Running one command against several Python versions at once."""
+
+from __future__ import annotations
+
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, TextIO
+
+from yen import (
+    RELEASE_INDEX_PATH,
+    ensure_python,
+    installed_python_version,
+    venv_binary_path,
+)
+from yen.github import resolve_python_version
+from yen.sync import sync_venv
+
+# Relative to the current directory, with one venv per requested version.
+MATRIX_VENVS_PATH = ".yen_matrix"
+
+
+class MatrixVenv(NamedTuple):
+    requested_python: str
+    python_version: str
+    venv_path: str
+
+
+class MatrixResult(NamedTuple):
+    python_version: str
+    returncode: int
+    # In seconds
+    duration: float
+
+
+def prepare_venvs(
+    requested_pythons: list[str],
+    requirements_paths: list[str],
+    venvs_path: str = MATRIX_VENVS_PATH,
+) -> list[MatrixVenv]:
+    """
+    Creates or reuses a venv for each requested Python, with the requirements
+    installed. All Pythons are downloaded and all venvs set up concurrently.
+    """
+
+    def resolve(requested_python: str) -> str:
+        installed_version = installed_python_version(requested_python)
+        if installed_version is not None:
+            return installed_version
+
+        python_version, _ = resolve_python_version(requested_python, RELEASE_INDEX_PATH)
+        return python_version
+
+    def prepare(requested_python: str, python_version: str) -> MatrixVenv:
+        venv_path = os.path.abspath(os.path.join(venvs_path, requested_python))
+        sync_venv(venv_path, python_version, requirements_paths)
+        return MatrixVenv(requested_python, python_version, venv_path)
+
+    with ThreadPoolExecutor(max_workers=len(requested_pythons) or 1) as executor:
+        python_versions = list(executor.map(resolve, requested_pythons))
+        # Requests like 3.11 and 3.11.9 can resolve to the same version, which
+        # must only be downloaded once.
+        list(executor.map(ensure_python, set(python_versions)))
+        return list(executor.map(prepare, requested_pythons, python_versions))
+
+
+def _run_in_venv(
+    matrix_venv: MatrixVenv,
+    command: list[str],
+    output: TextIO,
+    output_lock: threading.Lock,
+) -> MatrixResult:
+    """Runs the command with the venv activated, prefixing each output line."""
+    venv_bin_path = os.path.dirname(venv_binary_path("python", matrix_venv.venv_path))
+    env = {
+        **os.environ,
+        "VIRTUAL_ENV": matrix_venv.venv_path,
+        "PATH": venv_bin_path + os.pathsep + os.environ.get("PATH", ""),
+    }
+    env.pop("PYTHONHOME", None)
+    executable_path = shutil.which(command[0], path=env["PATH"]) or command[0]
+    prefix = f"\033[1m[{matrix_venv.python_version}]\033[m "
+
+    start_time = time.monotonic()
+    try:
+        process = subprocess.Popen(
+            [executable_path, *command[1:]],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            env=env,
+            text=True,
+            errors="replace",
+        )
+    except OSError as exc:
+        with output_lock:
+            print(f"{prefix}{exc}", file=output, flush=True)
+        return MatrixResult(matrix_venv.python_version, 127, 0.0)
+
+    assert process.stdout is not None
+    for line in process.stdout:
+        if not line.endswith("\n"):
+            line += "\n"
+        # Whole lines at a time, so output of parallel runs never interleaves.
+        with output_lock:
+            output.write(prefix + line)
+            output.flush()
+
+    returncode = process.wait()
+    duration = time.monotonic() - start_time
+    return MatrixResult(matrix_venv.python_version, returncode, duration)
+
+
+def run_matrix(
+    matrix_venvs: list[MatrixVenv],
+    command: list[str],
+    *,
+    jobs: int | None = None,
+    output: TextIO = sys.stdout,
+) -> list[MatrixResult]:
+    """
+    Runs the command in every venv, at most `jobs` at a time. Defaults to
+    running all of them at once. Results are in the order of `matrix_venvs`.
+    """
+    output_lock = threading.Lock()
+    with ThreadPoolExecutor(max_workers=jobs or len(matrix_venvs) or 1) as executor:
+        return list(
+            executor.map(
+                lambda matrix_venv: _run_in_venv(
+                    matrix_venv, command, output, output_lock
+                ),
+                matrix_venvs,
+            )
+        )
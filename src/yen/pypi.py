@@ -0,0 +1,47 @@
+"""Helpers for querying the Python package index."""
+
+from __future__ import annotations
+
+import json
+import re
+import urllib.error
+import urllib.parse
+from urllib.request import urlopen
+
+PYPI_JSON_API_URL = "https://pypi.org/pypi/"
+# The distribution name at the start of a requirement like `foo[bar]>=1.0`
+REQUIREMENT_NAME_REGEX = re.compile(r"^([A-Za-z0-9][A-Za-z0-9._-]*)")
+
+
+class PackageNotFound(Exception):
+    """Raised when the package doesn't exist on the index."""
+
+
+def normalize_name(package_name: str) -> str:
+    """Normalizes a package name as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", package_name).lower()
+
+
+def requirement_name(requirement: str) -> str | None:
+    """Returns the package name in a requirement, if it names a package."""
+    match = REQUIREMENT_NAME_REGEX.match(requirement)
+    # Paths and URLs don't have a name.
+    if match is None or "/" in requirement or "\\" in requirement:
+        return None
+
+    return match[1]
+
+
+def latest_version(package_name: str) -> str:
+    """Returns the latest released version of the package."""
+    url = urllib.parse.urljoin(PYPI_JSON_API_URL, f"{package_name}/json")
+    try:
+        with urlopen(url) as response:
+            package_data = json.load(response)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 404:
+            raise PackageNotFound(package_name) from exc
+        raise
+
+    version: str = package_data["info"]["version"]
+    return version
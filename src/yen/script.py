@@ -0,0 +1,84 @@
+"""Running single-file scripts with inline metadata, as described in PEP 723."""
+
+from __future__ import annotations
+
+import re
+from typing import TypedDict
+
+from yen import list_installed_pythons
+from yen.github import NotAvailable, list_pythons
+from yen.specifiers import InvalidRequirement, parse_version, specifier_contains
+
+SCRIPT_METADATA_REGEX = re.compile(
+    r"(?m)^# /// (?P<type>[a-zA-Z0-9-]+)$\s(?P<content>(^#(| .*)$\s)+)^# ///$"
+)
+
+
+class ScriptError(Exception):
+    """Raised when a script's inline metadata can't be used."""
+
+
+class ScriptMetadata(TypedDict):
+    requires_python: str | None
+    dependencies: list[str]
+
+
+def read_script_metadata(script_path: str) -> ScriptMetadata:
+    """Returns the `script` metadata block of the file, if it has one."""
+    with open(script_path, encoding="utf-8") as script_file:
+        source = script_file.read()
+
+    blocks = [
+        match
+        for match in SCRIPT_METADATA_REGEX.finditer(source)
+        if match["type"] == "script"
+    ]
+    if not blocks:
+        return {"requires_python": None, "dependencies": []}
+    if len(blocks) > 1:
+        raise ScriptError(f"{script_path} has multiple `script` metadata blocks")
+
+    try:
+        import tomllib
+    except ImportError:
+        raise ScriptError("reading script metadata needs yen to run on Python 3.11+")
+
+    content = "".join(
+        line[2:] if line.startswith("# ") else line[1:]
+        for line in blocks[0]["content"].splitlines(keepends=True)
+    )
+    try:
+        metadata = tomllib.loads(content)
+    except tomllib.TOMLDecodeError as exc:
+        raise ScriptError(f"invalid metadata in {script_path}: {exc}")
+
+    return {
+        "requires_python": metadata.get("requires-python"),
+        "dependencies": list(metadata.get("dependencies", [])),
+    }
+
+
+def python_satisfies(python_version: str, requires_python: str) -> bool:
+    """Checks a Python version against a version specifier like `>=3.9,<3.13`."""
+    version = parse_version(python_version)
+    assert version is not None
+    try:
+        return specifier_contains(requires_python, version)
+    except InvalidRequirement:
+        raise ScriptError(f"unsupported requires-python: {requires_python}")
+
+
+def pick_python_version(requires_python: str) -> str:
+    """
+    Returns the newest Python version that satisfies `requires_python`,
+    preferring Pythons that are already installed, so nothing is downloaded.
+    """
+    for python_version in list_installed_pythons():
+        if python_satisfies(python_version, requires_python):
+            return python_version
+
+    for python_version in list_pythons():
+        if python_satisfies(python_version, requires_python):
+            return python_version
+
+    raise NotAvailable
@@ -0,0 +1,320 @@
+"""
+Just enough of PEP 440 versions and specifiers, and PEP 508 requirements and
+environment markers, for resolving packages without depending on `packaging`.
+"""
+
+from __future__ import annotations
+
+import operator
+import re
+from typing import Any, Callable, NamedTuple
+
+VERSION_REGEX = re.compile(
+    r"""
+    ^\s*v?
+    (?:(?P<epoch>\d+)!)?
+    (?P<release>\d+(?:\.\d+)*)
+    (?:[-_.]?(?P<pre_label>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre>\d+)?)?
+    (?:-(?P<implicit_post>\d+)|[-_.]?(?P<post_label>post|rev|r)[-_.]?(?P<post>\d+)?)?
+    (?:[-_.]?(?P<dev_label>dev)[-_.]?(?P<dev>\d+)?)?
+    (?:\+(?P<local>[a-z0-9]+(?:[-_.][a-z0-9]+)*))?
+    \s*$
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+PRE_RELEASE_LABELS = {
+    "a": "a",
+    "alpha": "a",
+    "b": "b",
+    "beta": "b",
+    "c": "rc",
+    "rc": "rc",
+    "pre": "rc",
+    "preview": "rc",
+}
+# Arbitrary equality, `===`, is treated like `==`.
+SPECIFIER_CLAUSE_REGEX = re.compile(r"^(?:=?)(~=|==|!=|<=|>=|<|>)\s*(\S+?)(\.\*)?$")
+COMPARISON_OPERATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+}
+REQUIREMENT_REGEX = re.compile(
+    r"""
+    ^\s*(?P<name>[A-Za-z0-9][A-Za-z0-9._-]*)
+    \s*(?:\[(?P<extras>[^\]]*)\])?
+    \s*\(?(?P<specifier>[^;()]*)\)?
+    \s*(?:;\s*(?P<marker>.*?))?\s*$
+    """,
+    re.VERBOSE,
+)
+MARKER_TOKEN_REGEX = re.compile(
+    r"""
+    \s*(
+        '[^']*' | "[^"]*"
+        | ===|==|!=|<=|>=|~=|<|>
+        | \bnot\s+in\b | \bin\b | \band\b | \bor\b
+        | \( | \)
+        | [a-z_]+
+    )
+    """,
+    re.VERBOSE,
+)
+# Markers whose values are compared as versions, when possible.
+VERSION_MARKERS = {"python_version", "python_full_version", "implementation_version"}
+
+
+class InvalidRequirement(Exception):
+    """Raised for requirements and markers that can't be parsed."""
+
+
+class Version(NamedTuple):
+    epoch: int
+    release: tuple[int, ...]
+    pre: tuple[str, int] | None
+    post: int | None
+    dev: int | None
+    local: str | None
+
+    @property
+    def is_prerelease(self) -> bool:
+        return self.pre is not None or self.dev is not None
+
+    def sort_key(self) -> tuple[object, ...]:
+        release = self.release
+        while len(release) > 1 and release[-1] == 0:
+            release = release[:-1]
+
+        pre_key: tuple[object, ...]
+        if self.pre is not None:
+            pre_key = (0, *self.pre)
+        elif self.dev is not None and self.post is None:
+            # `1.0.dev1` comes before `1.0a1`
+            pre_key = (-1,)
+        else:
+            pre_key = (1,)
+
+        post_key = (-1,) if self.post is None else (0, self.post)
+        dev_key = (1,) if self.dev is None else (0, self.dev)
+        local_key = tuple(
+            (1, int(part), "") if part.isdigit() else (0, 0, part)
+            for part in re.split(r"[-_.]", self.local or "")
+            if part
+        )
+        return (self.epoch, release, pre_key, post_key, dev_key, local_key)
+
+    def public(self) -> Version:
+        return self._replace(local=None)
+
+
+def parse_version(version_string: str) -> Version | None:
+    """Returns the parsed version, or None if it isn't a valid PEP 440 version."""
+    match = VERSION_REGEX.match(version_string)
+    if match is None:
+        return None
+
+    pre = None
+    if match["pre_label"] is not None:
+        pre = (PRE_RELEASE_LABELS[match["pre_label"].lower()], int(match["pre"] or 0))
+
+    post = None
+    if match["implicit_post"] is not None:
+        post = int(match["implicit_post"])
+    elif match["post_label"] is not None:
+        post = int(match["post"] or 0)
+
+    return Version(
+        epoch=int(match["epoch"] or 0),
+        release=tuple(int(part) for part in match["release"].split(".")),
+        pre=pre,
+        post=post,
+        dev=int(match["dev"] or 0) if match["dev_label"] is not None else None,
+        local=match["local"].lower() if match["local"] is not None else None,
+    )
+
+
+def _release_prefix_matches(version: Version, prefix: Version) -> bool:
+    """For `==1.2.*`, compares only the release parts that are given."""
+    if version.epoch != prefix.epoch:
+        return False
+
+    length = len(prefix.release)
+    padded_release = version.release + (0,) * (length - len(version.release))
+    return padded_release[:length] == prefix.release
+
+
+def _clause_matches(version: Version, clause: str) -> bool:
+    match = SPECIFIER_CLAUSE_REGEX.match(clause)
+    if match is None:
+        raise InvalidRequirement(f"invalid version specifier: {clause}")
+
+    specifier_operator, clause_version_string, wildcard = match.groups()
+    clause_version = parse_version(clause_version_string)
+    if clause_version is None:
+        raise InvalidRequirement(f"invalid version specifier: {clause}")
+
+    if wildcard and specifier_operator in ("==", "!="):
+        prefix_matches = _release_prefix_matches(version, clause_version)
+        return prefix_matches if specifier_operator == "==" else not prefix_matches
+
+    if specifier_operator == "~=":
+        prefix = clause_version._replace(release=clause_version.release[:-1])
+        return version.sort_key() >= clause_version.sort_key() and (
+            _release_prefix_matches(version, prefix)
+        )
+
+    if clause_version.local is None:
+        # Local versions match their public version, like `1.0+cpu` for `==1.0`
+        version = version.public()
+
+    return COMPARISON_OPERATORS[specifier_operator](
+        version.sort_key(), clause_version.sort_key()
+    )
+
+
+def specifier_contains(
+    specifier: str,
+    version: Version,
+    *,
+    prereleases: bool = False,
+) -> bool:
+    """
+    Checks if the version satisfies all clauses of a specifier like
+    `>=1.0,!=1.3.*`. Pre-releases only match if `prereleases` is True, or if
+    the specifier itself mentions one.
+    """
+    clauses = [clause.strip() for clause in specifier.split(",") if clause.strip()]
+    if version.is_prerelease and not prereleases:
+        clause_versions = [parse_version(clause.lstrip("=!<>~")) for clause in clauses]
+        if not any(
+            clause_version is not None and clause_version.is_prerelease
+            for clause_version in clause_versions
+        ):
+            return False
+
+    return all(_clause_matches(version, clause) for clause in clauses)
+
+
+class Requirement(NamedTuple):
+    name: str
+    extras: frozenset[str]
+    specifier: str
+    marker: str | None
+
+
+def parse_requirement(requirement_string: str) -> Requirement:
+    if "@" in requirement_string.split(";")[0]:
+        raise InvalidRequirement(
+            f"URL requirements are not supported: {requirement_string}"
+        )
+
+    match = REQUIREMENT_REGEX.match(requirement_string)
+    if match is None:
+        raise InvalidRequirement(f"invalid requirement: {requirement_string}")
+
+    extras = frozenset(
+        extra.strip().lower()
+        for extra in (match["extras"] or "").split(",")
+        if extra.strip()
+    )
+    return Requirement(
+        match["name"],
+        extras,
+        match["specifier"].replace(" ", ""),
+        match["marker"] or None,
+    )
+
+
+def _compare_marker_values(
+    variable: str | None, left: str, marker_operator: str, right: str
+) -> bool:
+    if marker_operator == "in":
+        return left in right
+    if marker_operator == "not in":
+        return left not in right
+
+    if variable in VERSION_MARKERS or marker_operator in ("~=", "==="):
+        left_version = parse_version(left)
+        if left_version is not None and parse_version(right.rstrip(".*")) is not None:
+            return specifier_contains(
+                marker_operator + right, left_version, prereleases=True
+            )
+
+    if marker_operator == "===":
+        return left == right
+
+    if marker_operator not in COMPARISON_OPERATORS:
+        raise InvalidRequirement(f"can't compare {left!r} {marker_operator} {right!r}")
+
+    return COMPARISON_OPERATORS[marker_operator](left, right)
+
+
+def evaluate_marker(marker: str, environment: dict[str, str]) -> bool:
+    """Evaluates an environment marker like `python_version < "3.11"`."""
+    tokens: list[str] = MARKER_TOKEN_REGEX.findall(marker)
+    if "".join(tokens).replace(" ", "") != marker.replace(" ", ""):
+        raise InvalidRequirement(f"invalid marker: {marker}")
+
+    position = 0
+
+    def take() -> str:
+        nonlocal position
+        if position >= len(tokens):
+            raise InvalidRequirement(f"invalid marker: {marker}")
+        position += 1
+        return tokens[position - 1]
+
+    def peek() -> str | None:
+        return tokens[position] if position < len(tokens) else None
+
+    def value() -> tuple[str | None, str]:
+        """Returns the variable name, if any, and its value."""
+        token = take()
+        if token[0] in "'\"":
+            return None, token[1:-1]
+        if token not in environment:
+            raise InvalidRequirement(f"unknown marker variable {token} in {marker}")
+        return token, environment[token]
+
+    def comparison() -> bool:
+        if peek() == "(":
+            take()
+            result = or_expression()
+            if take() != ")":
+                raise InvalidRequirement(f"invalid marker: {marker}")
+            return result
+
+        left_variable, left = value()
+        marker_operator = " ".join(take().split())
+        right_variable, right = value()
+        if "extra" in (left_variable, right_variable):
+            # Extras are compared by their normalized names
+            left = re.sub(r"[-_.]+", "-", left).lower()
+            right = re.sub(r"[-_.]+", "-", right).lower()
+
+        return _compare_marker_values(
+            left_variable or right_variable, left, marker_operator, right
+        )
+
+    def and_expression() -> bool:
+        result = comparison()
+        while peek() == "and":
+            take()
+            result = comparison() and result
+        return result
+
+    def or_expression() -> bool:
+        result = and_expression()
+        while peek() == "or":
+            take()
+            result = and_expression() or result
+        return result
+
+    result = or_expression()
+    if position != len(tokens):
+        raise InvalidRequirement(f"invalid marker: {marker}")
+
+    return result
@@ -0,0 +1,241 @@
+"""Disk usage accounting and pruning of downloaded Pythons and installed tools."""
+
+from __future__ import annotations
+
+import os
+import os.path
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from yen import (
+    PYTHON_INSTALLS_PATH,
+    last_used_time,
+    list_installed_tools,
+    python_binary_path,
+    read_venv_config,
+    tool_paths,
+    uninstall_package,
+    venv_python_version,
+)
+from yen.template import TEMPLATES_PATH
+
+# Incomplete Pythons younger than this might still be downloading.
+INCOMPLETE_GRACE_PERIOD = 60 * 60
+
+
+class PythonUsage(NamedTuple):
+    version: str
+    path: str
+    size: int
+    last_used: float
+    tools: list[str]
+    # True if the Python binary is missing, eg. from an interrupted download.
+    is_incomplete: bool
+
+
+class ToolUsage(NamedTuple):
+    package_name: str
+    path: str
+    size: int
+    last_used: float
+    python_version: str | None
+
+
+class DiskUsage(NamedTuple):
+    pythons: list[PythonUsage]
+    tools: list[ToolUsage]
+
+    @property
+    def total_size(self) -> int:
+        return sum(python.size for python in self.pythons) + sum(
+            tool.size for tool in self.tools
+        )
+
+
+def directory_size(path: str) -> int:
+    """Returns the total size of all files inside the directory, in bytes."""
+    total_size = 0
+    pending_directories = [path]
+    while pending_directories:
+        with os.scandir(pending_directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending_directories.append(entry.path)
+                else:
+                    total_size += entry.stat(follow_symlinks=False).st_size
+
+    return total_size
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            break
+        size /= 1024
+
+    return f"{size:.1f} {unit}"
+
+
+def tool_last_used_time(package_name: str) -> float:
+    """
+    Returns when the tool was last used, by yen or through its shim. Running
+    the shim doesn't involve yen, but reading it updates its access time, on
+    filesystems that aren't mounted with `noatime`.
+    """
+    shim_path, venv_path = tool_paths(package_name)
+    last_used = last_used_time(venv_path)
+    try:
+        return max(last_used, os.stat(shim_path).st_atime)
+    except OSError:
+        return last_used
+
+
+def _venv_python_versions(venvs_path: str) -> set[str]:
+    """Returns the Python versions used by the venvs inside the folder."""
+    python_versions: set[str] = set()
+    if not os.path.isdir(venvs_path):
+        return python_versions
+
+    for venv_name in os.listdir(venvs_path):
+        try:
+            python_versions.add(
+                read_venv_config(os.path.join(venvs_path, venv_name))["version"]
+            )
+        except (OSError, KeyError):
+            pass  # Not a venv
+
+    return python_versions
+
+
+def disk_usage() -> DiskUsage:
+    """Scans the sizes of all Pythons and tools, in parallel."""
+    python_versions = (
+        sorted(
+            python_version
+            for python_version in os.listdir(PYTHON_INSTALLS_PATH)
+            if os.path.isdir(os.path.join(PYTHON_INSTALLS_PATH, python_version))
+        )
+        if os.path.isdir(PYTHON_INSTALLS_PATH)
+        else []
+    )
+    python_paths = [
+        os.path.join(PYTHON_INSTALLS_PATH, python_version)
+        for python_version in python_versions
+    ]
+    package_names = list_installed_tools()
+    venv_paths = [tool_paths(package_name)[1] for package_name in package_names]
+
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as pool:
+        python_sizes = list(pool.map(directory_size, python_paths))
+        venv_sizes = list(pool.map(directory_size, venv_paths))
+
+    tools = []
+    for package_name, venv_path, venv_size in zip(
+        package_names, venv_paths, venv_sizes
+    ):
+        try:
+            python_version: str | None = venv_python_version(venv_path)
+        except (OSError, KeyError):
+            python_version = None
+
+        tools.append(
+            ToolUsage(
+                package_name,
+                venv_path,
+                venv_size,
+                tool_last_used_time(package_name),
+                python_version,
+            )
+        )
+
+    pythons = [
+        PythonUsage(
+            python_version,
+            python_path,
+            python_size,
+            last_used_time(python_path),
+            [
+                tool.package_name
+                for tool in tools
+                if tool.python_version == python_version
+            ],
+            is_incomplete=not os.path.isfile(python_binary_path(python_path)),
+        )
+        for python_version, python_path, python_size in zip(
+            python_versions, python_paths, python_sizes
+        )
+    ]
+    return DiskUsage(pythons, tools)
+
+
+def prune(
+    *,
+    older_than_days: float | None = None,
+    keep_tools: int | None = None,
+    prune_pythons: bool = False,
+    dry_run: bool = False,
+) -> list[str]:
+    """
+    Removes tools and Pythons according to the given policies, and returns
+    the paths that were removed:
+
+    - Incomplete Python installs are always removed, unless they might still
+      be downloading.
+    - Tools not used in the last `older_than_days` days are removed.
+    - Only the `keep_tools` most recently used tools are kept.
+    - With `prune_pythons`, Pythons that weren't used in the last
+      `older_than_days` days are removed, unless a remaining tool, a template
+      or a cached venv needs them. Venvs made with `yen create`, `yen sync`
+      and `yen matrix` aren't tracked, so they can lose their Python.
+    """
+    # Imported here, as `yen.cache` uses `directory_size` from this module.
+    from yen.cache import EXEC_CACHE_PATH, RUN_CACHE_PATH
+
+    usage = disk_usage()
+    cutoff_time = (
+        time.time() - older_than_days * 24 * 60 * 60
+        if older_than_days is not None
+        else None
+    )
+
+    tools_by_recency = sorted(
+        usage.tools, key=lambda tool: tool.last_used, reverse=True
+    )
+    removed_tools = []
+    for index, tool in enumerate(tools_by_recency):
+        is_stale = cutoff_time is not None and tool.last_used < cutoff_time
+        is_beyond_limit = keep_tools is not None and index >= keep_tools
+        if is_stale or is_beyond_limit:
+            removed_tools.append(tool)
+
+    removed_paths = []
+    for tool in removed_tools:
+        if not dry_run:
+            uninstall_package(tool.package_name)
+        removed_paths.append(tool.path)
+
+    removed_tool_names = {tool.package_name for tool in removed_tools}
+    # Other venvs yen knows of, that would break without their Python.
+    needed_python_versions: set[str] = set()
+    for venvs_path in (TEMPLATES_PATH, RUN_CACHE_PATH, EXEC_CACHE_PATH):
+        needed_python_versions |= _venv_python_versions(venvs_path)
+
+    for python in usage.pythons:
+        is_needed = python.version in needed_python_versions or any(
+            package_name not in removed_tool_names for package_name in python.tools
+        )
+        is_stale = (
+            prune_pythons and cutoff_time is not None and python.last_used < cutoff_time
+        )
+        is_abandoned = (
+            python.is_incomplete
+            and python.last_used < time.time() - INCOMPLETE_GRACE_PERIOD
+        )
+        if is_abandoned or (is_stale and not is_needed):
+            if not dry_run:
+                shutil.rmtree(python.path, ignore_errors=True)
+            removed_paths.append(python.path)
+
+    return removed_paths
@@ -0,0 +1,358 @@
+"""Keeping project venvs in sync with their requirements."""
+
+from __future__ import annotations
+
+import email.parser
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+import typing
+from typing import Iterable, Iterator, NamedTuple, TypedDict
+
+from yen import create_venv, ensure_python, site_packages_paths, venv_binary_path
+from yen.installer import installed_distributions
+from yen.pypi import normalize_name, requirement_name
+
+# Stored inside the synced venv.
+SYNC_STATE_FILENAME = "yen_sync.json"
+
+
+class SyncError(Exception):
+    """Raised when the requirements can't be read."""
+
+
+class SyncState(TypedDict):
+    requested_python: str
+    python_version: str
+    python_bin_path: str
+    # Size and modification time of each input file, to skip hashing them.
+    input_stats: dict[str, list[int]]
+    inputs_hash: str
+    # Requirement lines, along with their own options, like `--hash`.
+    requirements: list[str]
+    pip_options: list[str]
+    constraints_hash: str
+
+
+class SyncResult(NamedTuple):
+    status: typing.Literal["unchanged", "created", "updated"]
+    added: list[str]
+    removed: list[str]
+
+
+def _file_stat(path: str) -> list[int]:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _read_pyproject_dependencies(pyproject_path: str) -> list[str]:
+    try:
+        import tomllib
+    except ImportError:
+        raise SyncError("reading pyproject.toml needs yen to run on Python 3.11+")
+
+    with open(pyproject_path, "rb") as pyproject_file:
+        pyproject = tomllib.load(pyproject_file)
+
+    return list(pyproject.get("project", {}).get("dependencies", []))
+
+
+def _logical_lines(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Joins lines continued with a backslash, and drops comments and extra
+    whitespace, the way pip does.
+    """
+    continued_line = ""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.endswith("\\"):
+            continued_line += line[:-1] + " "
+            continue
+
+        line = continued_line + line
+        continued_line = ""
+        line = line.split(" #")[0].split("\t#")[0]
+        if not line.strip().startswith("#"):
+            yield " ".join(line.split())
+
+    if continued_line:
+        yield " ".join(continued_line.split())
+
+
+def _option_value(line: str) -> str:
+    """Returns the value of an option line like `-c file` or `--constraint=file`."""
+    if line.startswith("--"):
+        return line.split("=", 1)[1] if "=" in line.split()[0] else line.split()[1]
+
+    return line.split(maxsplit=1)[1]
+
+
+def read_requirements(
+    requirements_path: str,
+    input_files: list[str] | None = None,
+) -> tuple[list[str], list[str]]:
+    """
+    Returns the requirements and pip options in a requirements file or in a
+    `pyproject.toml`. Included `-r` files are followed, `-c` constraint files
+    are passed on to pip, and every file read is appended to `input_files`.
+    Editable requirements count as requirements, with local paths made
+    absolute, relative to the file they're in.
+    """
+    if input_files is not None:
+        input_files.append(os.path.abspath(requirements_path))
+
+    if not os.path.isfile(requirements_path):
+        raise SyncError(f"{requirements_path} does not exist")
+
+    if requirements_path.endswith(".toml"):
+        return _read_pyproject_dependencies(requirements_path), []
+
+    requirements_folder = os.path.dirname(requirements_path)
+    requirements: list[str] = []
+    pip_options: list[str] = []
+    with open(requirements_path) as requirements_file:
+        for line in _logical_lines(requirements_file):
+            if not line:
+                continue
+
+            if line.startswith(("-r ", "--requirement ", "--requirement=")):
+                included_path = os.path.join(requirements_folder, _option_value(line))
+                included_requirements, included_options = read_requirements(
+                    included_path, input_files
+                )
+                requirements += included_requirements
+                pip_options += included_options
+            elif line.startswith(("-c ", "--constraint ", "--constraint=")):
+                constraints_path = os.path.abspath(
+                    os.path.join(requirements_folder, _option_value(line))
+                )
+                if not os.path.isfile(constraints_path):
+                    raise SyncError(f"{constraints_path} does not exist")
+                if input_files is not None:
+                    input_files.append(constraints_path)
+                pip_options += ["-c", constraints_path]
+            elif line.startswith(("-e ", "--editable ", "--editable=")):
+                editable = _option_value(line)
+                local_path = os.path.join(requirements_folder, editable)
+                if os.path.exists(local_path):
+                    editable = os.path.abspath(local_path)
+                requirements.append(f"-e {editable}")
+            elif line.startswith("-"):
+                pip_options += line.split()
+            else:
+                requirements.append(line)
+
+    return requirements, pip_options
+
+
+def _requirement_name(requirement: str) -> str | None:
+    name = requirement_name(requirement)
+    return normalize_name(name) if name is not None else None
+
+
+def _still_required_names(venv_path: str, removed_names: set[str]) -> set[str]:
+    """
+    Returns the removed names that the other distributions in the venv still
+    depend on, directly or through one another. Markers are not evaluated,
+    so a package is kept if anything might need it.
+    """
+    dependencies: dict[str, set[str]] = {}
+    for site_packages_path in site_packages_paths(venv_path):
+        distributions = installed_distributions(site_packages_path)
+        for name, (_, dist_info_name) in distributions.items():
+            metadata_path = os.path.join(site_packages_path, dist_info_name, "METADATA")
+            try:
+                with open(metadata_path, encoding="utf-8") as metadata_file:
+                    metadata = email.parser.HeaderParser().parse(metadata_file)
+            except OSError:
+                continue
+
+            dependencies[name] = {
+                dependency_name
+                for dependency_name in map(
+                    _requirement_name, metadata.get_all("Requires-Dist") or []
+                )
+                if dependency_name is not None
+            }
+
+    required_names: set[str] = set()
+    pending_names = [name for name in dependencies if name not in removed_names]
+    while pending_names:
+        for dependency_name in dependencies.get(pending_names.pop(), set()):
+            if dependency_name not in removed_names - required_names:
+                continue
+            required_names.add(dependency_name)
+            pending_names.append(dependency_name)
+
+    return required_names
+
+
+def _constraints_hash(pip_options: list[str]) -> str:
+    constraints_hash = hashlib.sha256()
+    for option, value in zip(pip_options, pip_options[1:]):
+        if option == "-c":
+            with open(value, "rb") as constraints_file:
+                constraints_hash.update(constraints_file.read())
+
+    return constraints_hash.hexdigest()
+
+
+def _pip_install(
+    venv_python_path: str, requirements: list[str], pip_options: list[str]
+) -> None:
+    """
+    Installs the requirements through a requirements file, so that options
+    that belong to a single requirement, like `--hash`, work as they would
+    in the original file.
+    """
+    file_descriptor, requirements_path = tempfile.mkstemp(suffix=".txt")
+    try:
+        with os.fdopen(file_descriptor, "w") as requirements_file:
+            requirements_file.write("\n".join(requirements) + "\n")
+
+        subprocess.run(
+            [
+                *(venv_python_path, "-m", "pip", "install", *pip_options),
+                *("-r", requirements_path),
+            ],
+            check=True,
+            capture_output=True,
+        )
+    finally:
+        os.remove(requirements_path)
+
+
+def read_sync_state(venv_path: str) -> SyncState | None:
+    state_path = os.path.join(venv_path, SYNC_STATE_FILENAME)
+    if not os.path.exists(state_path):
+        return None
+
+    with open(state_path) as state_file:
+        return typing.cast(SyncState, json.load(state_file))
+
+
+def _write_sync_state(venv_path: str, state: SyncState) -> None:
+    state_path = os.path.join(venv_path, SYNC_STATE_FILENAME)
+    with open(state_path, "w") as state_file:
+        json.dump(state, state_file, indent=2)
+
+
+def _inputs_unchanged(state: SyncState, requested_python: str) -> bool:
+    """Only stat calls, so that a repeated sync costs next to nothing."""
+    if state["requested_python"] != requested_python:
+        return False
+
+    if not os.path.exists(state["python_bin_path"]):
+        return False
+
+    try:
+        return all(
+            _file_stat(path) == stat for path, stat in state["input_stats"].items()
+        )
+    except FileNotFoundError:
+        return False
+
+
+def sync_venv(
+    venv_path: str,
+    requested_python: str,
+    requirements_paths: list[str],
+) -> SyncResult:
+    """
+    Creates or updates the venv to match the requirements files. If the
+    inputs and the interpreter haven't changed since the last sync, nothing
+    is done. Otherwise only the added and removed requirements are applied.
+    """
+    state = read_sync_state(venv_path)
+    if state is not None and _inputs_unchanged(state, requested_python):
+        return SyncResult("unchanged", [], [])
+
+    input_files: list[str] = []
+    requirements: list[str] = []
+    pip_options: list[str] = []
+    for requirements_path in requirements_paths:
+        file_requirements, file_options = read_requirements(
+            requirements_path, input_files
+        )
+        requirements += file_requirements
+        pip_options += file_options
+
+    python_version, python_bin_path = ensure_python(requested_python)
+    constraints_hash = _constraints_hash(pip_options)
+    inputs_hash = hashlib.sha256(
+        json.dumps(
+            [python_version, sorted(requirements), pip_options, constraints_hash]
+        ).encode()
+    ).hexdigest()
+    new_state: SyncState = {
+        "requested_python": requested_python,
+        "python_version": python_version,
+        "python_bin_path": python_bin_path,
+        "input_stats": {path: _file_stat(path) for path in input_files},
+        "inputs_hash": inputs_hash,
+        "requirements": requirements,
+        "pip_options": pip_options,
+        "constraints_hash": constraints_hash,
+    }
+
+    if state is not None and state["inputs_hash"] == inputs_hash:
+        # Files were touched, but their contents are the same.
+        _write_sync_state(venv_path, new_state)
+        return SyncResult("unchanged", [], [])
+
+    if state is not None and state["python_version"] != python_version:
+        # A different interpreter needs a fresh venv.
+        shutil.rmtree(venv_path)
+        state = None
+
+    status: typing.Literal["created", "updated"] = "updated"
+    if not os.path.exists(venv_path):
+        create_venv(python_bin_path, venv_path)
+        status = "created"
+
+    old_requirements = state["requirements"] if state is not None else []
+    # Other options or constraints can change what any requirement resolves to.
+    options_changed = state is not None and (
+        state["pip_options"] != pip_options
+        or state.get("constraints_hash") != constraints_hash
+    )
+    added = [
+        requirement
+        for requirement in requirements
+        if options_changed or requirement not in old_requirements
+    ]
+    remaining_names = {_requirement_name(requirement) for requirement in requirements}
+    removed = [
+        requirement
+        for requirement in old_requirements
+        if requirement not in requirements
+        and _requirement_name(requirement) not in remaining_names
+    ]
+
+    venv_python_path = venv_binary_path("python", venv_path)
+    if added:
+        _pip_install(venv_python_path, added, pip_options)
+
+    removed_names = {
+        name
+        for name in (_requirement_name(requirement) for requirement in removed)
+        if name is not None
+    }
+    # Packages that are no longer listed may still be needed by the rest.
+    removed_names -= _still_required_names(venv_path, removed_names)
+    if removed_names:
+        subprocess.run(
+            [
+                *(venv_python_path, "-m", "pip", "uninstall", "--yes"),
+                *sorted(removed_names),
+            ],
+            check=True,
+            capture_output=True,
+        )
+
+    _write_sync_state(venv_path, new_state)
+    return SyncResult(status, added, removed)
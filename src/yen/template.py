@@ -0,0 +1,243 @@
+"""Named venv templates, that new venvs are cloned from."""
+
+from __future__ import annotations
+
+import errno
+import json
+import os
+import os.path
+import shutil
+import typing
+from typing import Callable, Literal, TypedDict
+
+from yen import (
+    ensure_python,
+    read_venv_config,
+    rewire_venv,
+    venv_binary_path,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+TEMPLATES_PATH = os.path.abspath(
+    os.getenv("YEN_TEMPLATES_PATH", os.path.expanduser("~/.yen/templates"))
+)
+TEMPLATE_METADATA_FILENAME = "yen_template.json"
+# Files that belong to the venv they're in, and shouldn't be cloned.
+UNCLONED_NAMES = {
+    TEMPLATE_METADATA_FILENAME,
+    "yen_manifest.json",
+    "yen_sync.json",
+    ".yen_last_used",
+}
+# From linux/fs.h, clones a file's extents on btrfs, XFS and friends.
+FICLONE = 0x40049409
+
+CloneMethod = Literal["reflink", "hardlink", "copy"]
+
+
+class TemplateError(Exception):
+    """Raised when a template can't be saved or used."""
+
+
+class TemplateMetadata(TypedDict):
+    name: str
+    # Where the venv was when it was saved. Scripts in it still point there.
+    prefix: str
+    python_version: str
+
+
+def _reflink(source_path: str, target_path: str) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflinks are not supported")
+
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        try:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+        except OSError:
+            os.remove(target_path)
+            raise
+
+    shutil.copystat(source_path, target_path)
+
+
+CLONE_FUNCTIONS: dict[CloneMethod, Callable[[str, str], object]] = {
+    "reflink": _reflink,
+    "hardlink": os.link,
+    "copy": shutil.copy2,
+}
+
+
+def clone_tree(
+    source_path: str,
+    target_path: str,
+    *,
+    allow_hardlinks: bool = True,
+) -> CloneMethod:
+    """
+    Clones a directory, using copy-on-write reflinks if the filesystem
+    supports them, then hardlinks, then plain copies. Symlinks are copied as
+    they are. Returns the last clone method that was used.
+    """
+    clone_methods: list[CloneMethod] = ["reflink", "hardlink", "copy"]
+    if not allow_hardlinks:
+        clone_methods.remove("hardlink")
+
+    def clone_file(source_file_path: str, target_file_path: str) -> None:
+        while True:
+            try:
+                CLONE_FUNCTIONS[clone_methods[0]](source_file_path, target_file_path)
+                return
+            except OSError:
+                if len(clone_methods) == 1:
+                    raise
+                # Not supported here, so don't try it for any other file either.
+                clone_methods.pop(0)
+
+    for root, dir_names, file_names in os.walk(source_path):
+        target_root = os.path.join(target_path, os.path.relpath(root, source_path))
+        os.makedirs(target_root, exist_ok=True)
+        for name in (*dir_names, *file_names):
+            if name in UNCLONED_NAMES:
+                continue
+
+            source_file_path = os.path.join(root, name)
+            target_file_path = os.path.join(target_root, name)
+            if os.path.islink(source_file_path):
+                os.symlink(os.readlink(source_file_path), target_file_path)
+            elif name in file_names:
+                clone_file(source_file_path, target_file_path)
+
+        # Symlinked directories were copied as symlinks, don't walk into them.
+        dir_names[:] = [
+            name for name in dir_names if not os.path.islink(os.path.join(root, name))
+        ]
+
+        shutil.copystat(root, target_root)
+
+    return clone_methods[0]
+
+
+def _rewrite_prefix(venv_path: str, old_prefix: str) -> None:
+    """
+    Points `pyvenv.cfg`, the activation scripts and script shebangs at the
+    venv's new location. Rewritten files are replaced rather than modified,
+    so hardlinked files in the template stay untouched.
+    """
+    venv_bin_path = os.path.dirname(venv_binary_path("python", venv_path))
+    file_paths = [os.path.join(venv_path, "pyvenv.cfg")] + [
+        os.path.join(venv_bin_path, file_name)
+        for file_name in os.listdir(venv_bin_path)
+    ]
+    old_prefix_bytes = os.fsencode(old_prefix)
+    new_prefix_bytes = os.fsencode(venv_path)
+    for file_path in file_paths:
+        if os.path.islink(file_path) or not os.path.isfile(file_path):
+            continue
+
+        with open(file_path, "rb") as file:
+            contents = file.read()
+
+        if old_prefix_bytes not in contents:
+            continue
+
+        with open(file_path + ".tmp", "wb") as file:
+            file.write(contents.replace(old_prefix_bytes, new_prefix_bytes))
+
+        shutil.copymode(file_path, file_path + ".tmp")
+        os.replace(file_path + ".tmp", file_path)
+
+
+def list_templates() -> list[str]:
+    if not os.path.isdir(TEMPLATES_PATH):
+        return []
+
+    return sorted(
+        name
+        for name in os.listdir(TEMPLATES_PATH)
+        if os.path.exists(
+            os.path.join(TEMPLATES_PATH, name, TEMPLATE_METADATA_FILENAME)
+        )
+    )
+
+
+def _template_path(name: str) -> str:
+    """
+    Returns the template's folder. Names that would point anywhere other
+    than a folder directly inside `TEMPLATES_PATH` are rejected.
+    """
+    separators = {"/", os.sep, os.altsep or os.sep}
+    if name in ("", ".", "..") or any(sep in name for sep in separators):
+        raise TemplateError(f"{name!r} is not a valid template name")
+
+    return os.path.join(TEMPLATES_PATH, name)
+
+
+def read_template_metadata(name: str) -> TemplateMetadata:
+    metadata_path = os.path.join(_template_path(name), TEMPLATE_METADATA_FILENAME)
+    if not os.path.exists(metadata_path):
+        raise TemplateError(f"template {name} does not exist")
+
+    with open(metadata_path) as metadata_file:
+        return typing.cast(TemplateMetadata, json.load(metadata_file))
+
+
+def save_template(name: str, venv_path: str) -> TemplateMetadata:
+    """
+    Saves a copy of the venv as a template, replacing any template with the
+    same name. The copy never shares files with the venv through hardlinks,
+    so changes to the venv can't leak into the template.
+    """
+    if not os.path.isfile(os.path.join(venv_path, "pyvenv.cfg")):
+        raise TemplateError(f"{venv_path} is not a venv")
+
+    template_path = _template_path(name)
+    temporary_path = template_path + ".tmp"
+    shutil.rmtree(temporary_path, ignore_errors=True)
+    clone_tree(venv_path, temporary_path, allow_hardlinks=False)
+
+    template_metadata: TemplateMetadata = {
+        "name": name,
+        "prefix": venv_path,
+        "python_version": read_venv_config(venv_path)["version"],
+    }
+    metadata_path = os.path.join(temporary_path, TEMPLATE_METADATA_FILENAME)
+    with open(metadata_path, "w") as metadata_file:
+        json.dump(template_metadata, metadata_file, indent=2)
+
+    shutil.rmtree(template_path, ignore_errors=True)
+    os.replace(temporary_path, template_path)
+    return template_metadata
+
+
+def remove_template(name: str) -> None:
+    read_template_metadata(name)
+    shutil.rmtree(_template_path(name))
+
+
+def create_from_template(name: str, venv_path: str) -> tuple[str, CloneMethod]:
+    """
+    Clones the template into a new venv at `venv_path`. Returns the venv's
+    Python version, and how its files were cloned.
+    """
+    template_metadata = read_template_metadata(name)
+    template_path = _template_path(name)
+    try:
+        clone_method = clone_tree(template_path, venv_path)
+        _rewrite_prefix(venv_path, template_metadata["prefix"])
+
+        python_home = read_venv_config(venv_path)["home"]
+        if not os.path.isdir(python_home):
+            # The template's Python was removed since, get it again.
+            python_version, python_bin_path = ensure_python(
+                template_metadata["python_version"]
+            )
+            rewire_venv(venv_path, python_bin_path, python_version)
+    except BaseException:
+        shutil.rmtree(venv_path, ignore_errors=True)
+        raise
+
+    return template_metadata["python_version"], clone_method
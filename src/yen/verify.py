@@ -0,0 +1,207 @@
+"""Verifying installed Pythons and tools against their manifests, and repairs."""
+
+from __future__ import annotations
+
+import csv
+import glob
+import os
+import os.path
+import shutil
+import subprocess
+import tempfile
+from typing import Literal, NamedTuple
+
+from yen import (
+    DEFAULT_PYTHON_VERSION,
+    PYTHON_INSTALLS_PATH,
+    RELEASE_INDEX_PATH,
+    SLIM_PROFILE,
+    download_python,
+    ensure_python,
+    install_package,
+    list_installed_tools,
+    python_binary_path,
+    read_python_metadata,
+    read_tool_metadata,
+    refresh_shim,
+    site_packages_paths,
+    tool_paths,
+    uninstall_package,
+    venv_binary_path,
+    venv_python_version,
+)
+from yen.github import resolve_python_version
+from yen.manifest import MANIFEST_FILENAME, verify_manifest, write_manifest
+
+
+class InstallCheck(NamedTuple):
+    kind: Literal["python", "tool"]
+    name: str
+    path: str
+    # None if the install has no manifest, eg. if an older yen installed it.
+    damaged: list[str] | None
+    rehashed: int
+
+
+def verify_installs() -> list[InstallCheck]:
+    """Checks all Pythons, and then all tools, against their manifests."""
+    checks = []
+    python_versions = (
+        sorted(os.listdir(PYTHON_INSTALLS_PATH))
+        if os.path.isdir(PYTHON_INSTALLS_PATH)
+        else []
+    )
+    for python_version in python_versions:
+        python_path = os.path.join(PYTHON_INSTALLS_PATH, python_version)
+        is_installed = os.path.isfile(python_binary_path(python_path))
+        if not is_installed and not os.path.exists(
+            os.path.join(python_path, MANIFEST_FILENAME)
+        ):
+            continue  # An interrupted download, `yen prune` cleans those up.
+
+        result = verify_manifest(python_path)
+        checks.append(
+            InstallCheck(
+                "python",
+                python_version,
+                python_path,
+                result.damaged if result is not None else None,
+                result.rehashed if result is not None else 0,
+            )
+        )
+
+    for package_name in list_installed_tools():
+        tool_metadata = read_tool_metadata(package_name)
+        shim_path, venv_path = tool_paths(package_name, tool_metadata["is_module"])
+        result = verify_manifest(venv_path)
+        damaged = result.damaged if result is not None else None
+        if not os.path.exists(shim_path):
+            damaged = [*(damaged or []), shim_path]
+
+        checks.append(
+            InstallCheck(
+                "tool",
+                package_name,
+                venv_path,
+                damaged,
+                result.rehashed if result is not None else 0,
+            )
+        )
+
+    return checks
+
+
+def repair_python(python_version: str) -> None:
+    """Downloads the same Python build again, in place of the damaged one."""
+    python_path = os.path.join(PYTHON_INSTALLS_PATH, python_version)
+    python_metadata = read_python_metadata(python_path)
+    if python_metadata is not None:
+        download_link = python_metadata["download_link"]
+        checksum: str | None = python_metadata["checksum"]
+        slim_profile = python_metadata["slim_profile"]
+    else:
+        _, download_link = resolve_python_version(python_version, RELEASE_INDEX_PATH)
+        checksum = None
+        slim_profile = SLIM_PROFILE
+
+    # Downloaded next to the damaged one first, so that a failed download
+    # doesn't leave the tools on this Python without one. The extra folder
+    # level keeps the new build from being listed as an installed Python.
+    temporary_path = tempfile.mkdtemp(prefix=".yen_repair_", dir=PYTHON_INSTALLS_PATH)
+    try:
+        new_python_path = os.path.join(temporary_path, python_version)
+        download_python(
+            python_version,
+            download_link,
+            checksum,
+            slim_profile=slim_profile,
+            download_directory=new_python_path,
+        )
+        os.replace(python_path, os.path.join(temporary_path, "damaged"))
+        os.replace(new_python_path, python_path)
+    finally:
+        shutil.rmtree(temporary_path, ignore_errors=True)
+
+
+def _owning_distributions(venv_path: str, damaged: list[str]) -> list[str] | None:
+    """
+    Returns the pinned distributions whose files are damaged, according to
+    their `RECORD`s. Returns None if some damaged file isn't owned by any.
+    """
+    owners: dict[str, str] = {}
+    for site_packages_path in site_packages_paths(venv_path):
+        for file_name in os.listdir(site_packages_path):
+            if not file_name.endswith(".dist-info"):
+                continue
+
+            record_path = os.path.join(site_packages_path, file_name, "RECORD")
+            if not os.path.isfile(record_path):
+                continue
+
+            name, _, version = file_name[: -len(".dist-info")].rpartition("-")
+            with open(record_path, newline="") as record_file:
+                for recorded_path, *_ in csv.reader(record_file):
+                    absolute_path = os.path.normpath(
+                        os.path.join(site_packages_path, recorded_path)
+                    )
+                    relative_path = os.path.relpath(absolute_path, venv_path)
+                    owners[relative_path] = f"{name}=={version}"
+
+    distributions = set()
+    for relative_path in damaged:
+        if relative_path not in owners:
+            return None
+        distributions.add(owners[relative_path])
+
+    return sorted(distributions)
+
+
+def repair_tool(package_name: str, damaged: list[str]) -> None:
+    """
+    Reinstalls only the distributions that own the damaged files. If the venv
+    itself is damaged, the tool is installed again from scratch.
+    """
+    tool_metadata = read_tool_metadata(package_name)
+    _, venv_path = tool_paths(package_name, tool_metadata["is_module"])
+
+    distributions = _owning_distributions(venv_path, damaged)
+    # Without pip in the venv, the whole tool is reinstalled from cached wheels.
+    if distributions is not None and tool_metadata["installer"] == "pip":
+        venv_python_path = venv_binary_path("python", venv_path)
+        try:
+            subprocess.run(
+                [
+                    *(venv_python_path, "-m", "pip", "install"),
+                    *("--force-reinstall", "--no-deps", *distributions),
+                ],
+                check=True,
+                capture_output=True,
+            )
+        except subprocess.CalledProcessError:
+            pass  # Damage to pip itself can stop it from running at all.
+        else:
+            refresh_shim(tool_metadata)
+            write_manifest(venv_path)
+            return
+
+    try:
+        python_version = venv_python_version(venv_path)
+    except (OSError, KeyError):
+        # `lib/pythonX.Y` still tells us which Python the venv was made with.
+        lib_names = glob.glob(os.path.join(venv_path, "lib", "python3.*"))
+        python_version = (
+            os.path.basename(lib_names[0])[len("python") :]
+            if lib_names
+            else DEFAULT_PYTHON_VERSION
+        )
+
+    _, python_bin_path = ensure_python(python_version)
+    uninstall_package(package_name)
+    install_package(
+        package_name,
+        python_bin_path,
+        tool_metadata["executable_name"],
+        is_module=tool_metadata["is_module"],
+        shim=tool_metadata["shim"],
+        installer=tool_metadata["installer"],
+    )
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import io
+import os
+import os.path
+import platform
+import tarfile
+
+import pytest
+
+from yen.extract import UnsafeTarMember, extract_tarball
+
+
+def make_tarball(tarball_path: str, members: list[tarfile.TarInfo]) -> None:
+    with tarfile.open(tarball_path, mode="w:gz") as tar:
+        for member in members:
+            if member.isfile():
+                data = member.name.encode()
+                member.size = len(data)
+                tar.addfile(member, io.BytesIO(data))
+            else:
+                tar.addfile(member)
+
+
+def file_member(name: str) -> tarfile.TarInfo:
+    return tarfile.TarInfo(name)
+
+
+def symlink_member(name: str, link_target: str) -> tarfile.TarInfo:
+    member = tarfile.TarInfo(name)
+    member.type = tarfile.SYMTYPE
+    member.linkname = link_target
+    return member
+
+
+def hardlink_member(name: str, link_target: str) -> tarfile.TarInfo:
+    member = tarfile.TarInfo(name)
+    member.type = tarfile.LNKTYPE
+    member.linkname = link_target
+    return member
+
+
+@pytest.mark.skipif(
+    platform.system() == "Windows", reason="Symlinks need privileges on Windows"
+)
+@pytest.mark.parametrize("max_workers", [0, 4])
+def test_extract_tarball(tmp_path: str, max_workers: int) -> None:
+    tarball_path = os.path.join(tmp_path, "python.tar.gz")
+    make_tarball(
+        tarball_path,
+        [
+            file_member("python/bin/python3.11"),
+            symlink_member("python/bin/python3", "python3.11"),
+            hardlink_member("python/bin/python", "python/bin/python3.11"),
+            file_member("python/lib/python3.11/idlelib/idle.py"),
+        ],
+    )
+
+    destination = os.path.join(tmp_path, "extracted")
+    extract_tarball(
+        tarball_path,
+        destination,
+        excluded_patterns=["*/idlelib/*"],
+        max_workers=max_workers,
+    )
+
+    bin_path = os.path.join(destination, "python", "bin")
+    with open(os.path.join(bin_path, "python3")) as file:
+        assert file.read() == "python/bin/python3.11"
+    assert os.readlink(os.path.join(bin_path, "python3")) == "python3.11"
+    assert os.path.samefile(
+        os.path.join(bin_path, "python"), os.path.join(bin_path, "python3.11")
+    )
+    assert not os.path.exists(os.path.join(destination, "python", "lib"))
+
+
+@pytest.mark.parametrize(
+    "member",
+    [
+        file_member("../outside.txt"),
+        file_member("python/../../outside.txt"),
+        file_member("/tmp/outside.txt"),
+        symlink_member("python/link", "../../outside.txt"),
+        symlink_member("python/link", "/etc/passwd"),
+        hardlink_member("python/link", "../outside.txt"),
+    ],
+    ids=lambda member: f"{member.name} -> {member.linkname}",
+)
+def test_extract_tarball_rejects_unsafe_members(
+    tmp_path: str, member: tarfile.TarInfo
+) -> None:
+    tarball_path = os.path.join(tmp_path, "python.tar.gz")
+    make_tarball(tarball_path, [member])
+
+    destination = os.path.join(tmp_path, "extracted")
+    with pytest.raises(UnsafeTarMember):
+        extract_tarball(tarball_path, destination, max_workers=0)
+
+    assert not os.path.lexists(os.path.join(tmp_path, "outside.txt"))
+    assert not os.path.lexists(os.path.join(destination, "python", "link"))
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import pytest
+
+from yen.specifiers import (
+    InvalidRequirement,
+    Version,
+    evaluate_marker,
+    parse_requirement,
+    parse_version,
+    specifier_contains,
+)
+
+ENVIRONMENT = {
+    "python_version": "3.11",
+    "python_full_version": "3.11.7",
+    "implementation_version": "3.11.7",
+    "sys_platform": "linux",
+    "platform_system": "Linux",
+    "os_name": "posix",
+    "extra": "",
+}
+
+
+def version(version_string: str) -> Version:
+    parsed_version = parse_version(version_string)
+    assert parsed_version is not None
+    return parsed_version
+
+
+def test_parse_version() -> None:
+    assert version("1.2.3") == Version(0, (1, 2, 3), None, None, None, None)
+    assert version("v1!2.0-RC.1.post2.dev3+Ubuntu.1") == Version(
+        1, (2, 0), ("rc", 1), 2, 3, "ubuntu.1"
+    )
+    assert version("1.0-1").post == 1
+    assert version("1.0alpha").pre == ("a", 0)
+    assert parse_version("not a version") is None
+    assert parse_version("1.0+") is None
+
+
+@pytest.mark.parametrize(
+    "ordered_versions",
+    [
+        ["1.0.dev1", "1.0a1", "1.0a2.dev1", "1.0a2", "1.0b1", "1.0rc1", "1.0"],
+        ["1.0", "1.0+local", "1.0.post1.dev1", "1.0.post1", "1.1"],
+        ["1.0+abc", "1.0+abc.1", "1.0+1", "1.0+2"],
+        ["2.0", "1!1.0"],
+    ],
+)
+def test_sort_key(ordered_versions: list[str]) -> None:
+    sort_keys = [
+        version(version_string).sort_key() for version_string in ordered_versions
+    ]
+    assert sort_keys == sorted(sort_keys)
+    assert len(set(sort_keys)) == len(sort_keys)
+
+
+def test_sort_key_ignores_trailing_zeros() -> None:
+    assert version("1.0").sort_key() == version("1.0.0").sort_key()
+    assert version("1").sort_key() == version("1.0.0.0").sort_key()
+
+
+@pytest.mark.parametrize(
+    ("specifier", "version_string", "expected"),
+    [
+        (">=1.0,<2", "1.5", True),
+        (">=1.0,<2", "2.0", False),
+        ("==1.0", "1.0.0", True),
+        ("==1.0", "1.0+cpu", True),
+        ("==1.0+cpu", "1.0", False),
+        ("!=1.0", "1.0.1", True),
+        ("~=1.4.2", "1.4.5", True),
+        ("~=1.4.2", "1.4.1", False),
+        ("~=1.4.2", "1.5.0", False),
+        ("~=1.4", "1.9", True),
+        ("~=1.4", "2.0", False),
+        ("==1.4.*", "1.4", True),
+        ("==1.4.*", "1.4.9.1", True),
+        ("==1.4.*", "1.40", False),
+        ("!=1.4.*", "1.5", True),
+        ("!=1.4.*", "1.4.2", False),
+        ("", "3.0", True),
+    ],
+)
+def test_specifier_contains(
+    specifier: str, version_string: str, expected: bool
+) -> None:
+    assert specifier_contains(specifier, version(version_string)) is expected
+
+
+def test_specifier_contains_prereleases() -> None:
+    # Pre-releases are skipped, unless asked for or mentioned in the specifier
+    assert not specifier_contains(">=1.0", version("2.0b1"))
+    assert specifier_contains(">=1.0", version("2.0b1"), prereleases=True)
+    assert specifier_contains(">=2.0b1", version("2.0b2"))
+    assert not specifier_contains("<2.0", version("2.0.dev1"))
+
+
+def test_invalid_specifier() -> None:
+    with pytest.raises(InvalidRequirement):
+        specifier_contains(">=foo", version("1.0"))
+
+
+def test_parse_requirement() -> None:
+    requirement = parse_requirement(
+        'Foo.Bar [Security, tests] (>= 1.0, < 2) ; python_version < "3.12"'
+    )
+    assert requirement.name == "Foo.Bar"
+    assert requirement.extras == frozenset({"security", "tests"})
+    assert requirement.specifier == ">=1.0,<2"
+    assert requirement.marker == 'python_version < "3.12"'
+
+    with pytest.raises(InvalidRequirement):
+        parse_requirement("foo @ https://example.com/foo.whl")
+
+
+@pytest.mark.parametrize(
+    ("marker", "expected"),
+    [
+        ('python_version < "3.12"', True),
+        ('python_version >= "3.9" and python_version < "3.11"', False),
+        ('python_full_version == "3.11.*"', True),
+        ('python_version ~= "3.10"', True),
+        ('"linux" in sys_platform', True),
+        ('sys_platform not in "win32 cygwin"', True),
+        (
+            'os_name == "nt" or (platform_system == "Linux" and python_version > "3")',
+            True,
+        ),
+        ("platform_system == 'Windows'", False),
+    ],
+)
+def test_evaluate_marker(marker: str, expected: bool) -> None:
+    assert evaluate_marker(marker, ENVIRONMENT) is expected
+
+
+def test_evaluate_marker_extras() -> None:
+    environment = {**ENVIRONMENT, "extra": "dev-tools"}
+    # Extras are compared by their normalized names
+    assert evaluate_marker('extra == "Dev_Tools"', environment)
+    assert evaluate_marker('"dev.tools" == extra', environment)
+    assert not evaluate_marker('extra == "docs"', environment)
+    assert not evaluate_marker('extra == "dev-tools"', ENVIRONMENT)
+
+
+@pytest.mark.parametrize(
+    "marker",
+    ['python_version < "3.12" and', "unknown_variable == '1'", 'python_version "3"'],
+)
+def test_invalid_marker(marker: str) -> None:
+    with pytest.raises(InvalidRequirement):
+        evaluate_marker(marker, ENVIRONMENT)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import os.path
 import platform
 import shutil
@@ -53,6 +54,8 @@ def yen_python_and_rust_path() -> list[tuple[str, ...]]:
 
 yen_paths = yen_python_and_rust_path()
 parametrize_python_and_rust_path = pytest.mark.parametrize(("yen_path",), yen_paths)
+# Commands added after the Rust port are only tested on the Python version of yen.
+(python_yen_path,) = yen_paths[0]
 
 
 class Failed(Exception): ...
@@ -110,6 +113,108 @@ def test_yen_create(yen_path: str) -> None:
         shutil.rmtree("testvenv", ignore_errors=True)
 
 
+def test_yen_create_older_patch_version() -> None:
+    output = run([python_yen_path, "list", "--all"])
+    assert "\n3.11.7\n" in output
+
+    # 3.11.7 is long gone from the latest python-build-standalone release
+    try:
+        output = run([python_yen_path, "create", "-p3.11.7", "testvenv"])
+        assert "Created" in output
+        assert "Python 3.11.7" in output
+        shutil.rmtree("testvenv")
+
+        # The installed 3.11.7 is no match for 3.11.1
+        output = run([python_yen_path, "create", "-p3.11.1", "testvenv"])
+        assert "Python 3.11.1" in output
+    finally:
+        shutil.rmtree("testvenv", ignore_errors=True)
+
+
+def test_yen_create_invalid_version() -> None:
+    for python_version in ("foo", "3.12t"):
+        with pytest.raises(Failed):
+            run([python_yen_path, "create", f"-p{python_version}", "testvenv"])
+    assert not os.path.exists("testvenv")
+
+
+def test_yen_create_from_template(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: str
+) -> None:
+    monkeypatch.setenv("YEN_TEMPLATES_PATH", os.path.join(tmp_path, "templates"))
+    base_venv_path = os.path.join(tmp_path, "base")
+    run([python_yen_path, "create", base_venv_path, "-p3.11"])
+    bin_folder = "Scripts" if platform.system() == "Windows" else "bin"
+    run([os.path.join(base_venv_path, bin_folder, "pip"), "install", "meowsay"])
+
+    output = run([python_yen_path, "template", "save", "base", base_venv_path])
+    assert "as template base" in output
+    shutil.rmtree(base_venv_path)
+
+    venv_path = os.path.join(tmp_path, "venv")
+    output = run([python_yen_path, "create", venv_path, "--from", "base"])
+    assert "from template base" in output
+
+    # The scripts point at the new venv
+    meowsay_output = run([os.path.join(venv_path, bin_folder, "meowsay"), "hi"])
+    assert "< hi >" in meowsay_output
+    prefix = run(
+        [
+            os.path.join(venv_path, bin_folder, "python"),
+            "-c",
+            "import sys; print(sys.prefix)",
+        ]
+    )
+    assert os.path.samefile(prefix.strip(), venv_path)
+
+    # Template names can't point outside of the templates folder
+    for name in ("..", "", os.path.join("..", "base")):
+        with pytest.raises(Failed):
+            run([python_yen_path, "template", "save", name, venv_path])
+    assert os.path.isdir(os.path.join(tmp_path, "templates", "base"))
+    assert os.path.isdir(venv_path)
+
+
+def test_yen_shared_pythons(monkeypatch: pytest.MonkeyPatch, tmp_path: str) -> None:
+    try:
+        # Makes sure there is a 3.11 in the usual place, to share it from there
+        run([python_yen_path, "create", "-p3.11", "testvenv"])
+        shutil.rmtree("testvenv")
+
+        user_pythons_path = os.path.join(tmp_path, "yen_pythons")
+        monkeypatch.setenv("YEN_PYTHONS_PATH", user_pythons_path)
+        monkeypatch.setenv("YEN_SHARED_PYTHONS_PATH", PYTHON_INSTALLS_PATH)
+        output = run([python_yen_path, "create", "-p3.11", "testvenv"])
+        assert "Created" in output
+
+        with open(os.path.join("testvenv", "pyvenv.cfg")) as config_file:
+            assert PYTHON_INSTALLS_PATH in config_file.read()
+        assert not os.path.exists(user_pythons_path)
+    finally:
+        shutil.rmtree("testvenv", ignore_errors=True)
+
+
+def test_yen_slim_python(monkeypatch: pytest.MonkeyPatch, tmp_path: str) -> None:
+    pythons_path = os.path.join(tmp_path, "yen_pythons")
+    monkeypatch.setenv("YEN_PYTHONS_PATH", pythons_path)
+    monkeypatch.setenv("YEN_SLIM", "headless")
+    try:
+        output = run([python_yen_path, "create", "-p3.12", "testvenv"])
+        assert "Created" in output
+    finally:
+        shutil.rmtree("testvenv", ignore_errors=True)
+
+    (python_version,) = os.listdir(pythons_path)
+    python_path = os.path.join(pythons_path, python_version)
+    with open(os.path.join(python_path, "yen_python.json")) as metadata_file:
+        assert json.load(metadata_file)["slim_profile"] == "headless"
+
+    for root, dirs, _ in os.walk(python_path):
+        assert "idlelib" not in dirs
+        assert "tkinter" not in dirs
+        assert not root.endswith(os.path.join("python3.12", "test"))
+
+
 @parametrize_python_and_rust_path
 def test_yen_install(yen_path: str) -> None:
     output = run([yen_path, "install", "-p3.10", "meowsay"])
@@ -212,6 +317,338 @@ def test_yen_run(yen_path: str) -> None:
     assert "already installed" in install_output
 
 
+@pytest.mark.skipif(platform.system() == "Windows", reason="Windows uses .exe shims")
+def test_yen_install_shim_modes() -> None:
+    output = run([python_yen_path, "install", "meowsay", "--shim", "fast"])
+    assert "Installed" in output
+    with open(os.path.join(PACKAGES_INSTALL_PATH, "meowsay")) as shim:
+        shebang = shim.readline()
+    assert shebang.startswith("#!") and shebang.rstrip().endswith("python -IS")
+
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+    run(
+        [
+            python_yen_path,
+            "install",
+            "astmath",
+            "--module",
+            "astmath",
+            "--shim",
+            "direct",
+        ]
+    )
+    with open(os.path.join(PACKAGES_INSTALL_PATH, "astmath")) as shim:
+        shebang = shim.readline()
+    assert shebang.rstrip().endswith("python -I")
+
+    astmath_output = run(["astmath", "'foo' * 3"], cwd=PACKAGES_INSTALL_PATH)
+    assert astmath_output == "foofoofoo\n"
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="Windows always uses pip")
+def test_yen_install_without_pip() -> None:
+    output = run(
+        [python_yen_path, "install", "-p3.11", "meowsay", "--installer", "yen"]
+    )
+    assert "Installed" in output
+
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+    venv_python_path = os.path.join(
+        PACKAGES_INSTALL_PATH, "venv_meowsay", "bin", "python"
+    )
+    pip_check = subprocess.run(
+        [venv_python_path, "-m", "pip", "--version"], capture_output=True
+    )
+    assert pip_check.returncode != 0
+
+    # Tools installed without pip can't be locked
+    with pytest.raises(Failed):
+        run([python_yen_path, "lock", "meowsay"])
+
+    run([python_yen_path, "verify"])
+
+
+def test_yen_run_pinned_version() -> None:
+    output = run([python_yen_path, "run", "-p3.11", "meowsay==1.0.2", "hi"])
+    assert "< hi >" in output
+    # Doesn't get installed as a tool
+    assert not os.path.exists(os.path.join(PACKAGES_INSTALL_PATH, "venv_meowsay"))
+
+    # The second time, the cached environment is used
+    output = run([python_yen_path, "run", "-p3.11", "meowsay==1.0.2", "hello"])
+    assert "< hello >" in output
+
+
+def test_yen_exec_script(tmp_path: str) -> None:
+    script_path = os.path.join(tmp_path, "script.py")
+    with open(script_path, "w") as script_file:
+        script_file.write(dedent("""\
+                # /// script
+                # requires-python = "==3.11.*"
+                # dependencies = ["meowsay==1.0.2"]
+                # ///
+                import sys
+                from meowsay import meowsay
+
+                print(sys.version_info[:2])
+                sys.argv[1:] = ["hello", *sys.argv[1:]]
+                meowsay()
+                """))
+
+    output = run([python_yen_path, "exec", script_path, "world"])
+    assert "(3, 11)" in output
+    assert "< hello world >" in output
+
+
+def test_yen_lock() -> None:
+    # Windows only has script shims
+    shim = "script" if platform.system() == "Windows" else "fast"
+    run([python_yen_path, "install", "-p3.11", "meowsay", "--shim", shim])
+    lockfile_path = os.path.join(PACKAGES_INSTALL_PATH, "yen.lock")
+    output = run([python_yen_path, "lock", "meowsay", "--output", lockfile_path])
+    assert "Locked 1 tool(s)" in output
+
+    with open(lockfile_path) as lockfile:
+        lockfile_data = json.load(lockfile)
+    locked_meowsay = lockfile_data["tools"]["meowsay"]
+
+    assert locked_meowsay["python"]["version"].startswith("3.11.")
+    assert locked_meowsay["is_module"] is False
+    assert locked_meowsay["shim"] == shim
+    locked_packages = {
+        package["name"]: package for package in locked_meowsay["packages"]
+    }
+    # pip itself is pinned as well
+    assert "pip" in locked_packages
+    assert locked_packages["meowsay"]["hashes"][0].startswith("sha256:")
+
+    output = run(
+        [python_yen_path, "install", "--lockfile", lockfile_path, "--force-reinstall"]
+    )
+    assert "Installed package" in output
+    assert "meowsay" in output
+    if shim == "fast":
+        with open(os.path.join(PACKAGES_INSTALL_PATH, "meowsay")) as shim_file:
+            assert shim_file.readline().rstrip().endswith("python -IS")
+
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+    # Lockfiles only install on the platform they were locked on
+    lockfile_data["platform"] = "Plan9-mips"
+    with open(lockfile_path, "w") as lockfile:
+        json.dump(lockfile_data, lockfile)
+    with pytest.raises(Failed):
+        run(
+            [
+                python_yen_path,
+                "install",
+                "--lockfile",
+                lockfile_path,
+                "--force-reinstall",
+            ]
+        )
+
+
+def test_yen_upgrade() -> None:
+    run([python_yen_path, "install", "meowsay"])
+    output = run([python_yen_path, "upgrade", "meowsay"])
+    assert "meowsay" in output
+    assert "up to date" in output
+
+    # Downgrade the package inside the venv, so that it is out of date
+    venv_bin_path = os.path.join(
+        PACKAGES_INSTALL_PATH,
+        "venv_meowsay",
+        "Scripts" if platform.system() == "Windows" else "bin",
+    )
+    run(
+        [
+            os.path.join(venv_bin_path, "python"),
+            "-m",
+            "pip",
+            "install",
+            "meowsay==1.0.1",
+        ]
+    )
+
+    output = run([python_yen_path, "upgrade", "--all"])
+    assert "Upgraded package" in output
+    assert "from 1.0.1" in output
+
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+
+def test_yen_python_upgrade() -> None:
+    run([python_yen_path, "install", "-p3.11", "meowsay"])
+    output = run([python_yen_path, "python", "upgrade", "3.11"])
+    assert "Python 3.11." in output
+    assert "is installed" in output
+
+    with open(os.path.join(PACKAGES_INSTALL_PATH, "venv_meowsay", "pyvenv.cfg")) as f:
+        assert "3.11." in f.read()
+
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+
+def test_yen_du_and_prune() -> None:
+    run([python_yen_path, "install", "-p3.11", "astmath", "--module", "astmath"])
+    run([python_yen_path, "install", "-p3.11", "meowsay"])
+
+    stray_file_path = os.path.join(PYTHON_INSTALLS_PATH, ".DS_Store")
+    try:
+        open(stray_file_path, "w").close()
+        output = run([python_yen_path, "du"])
+    finally:
+        os.remove(stray_file_path)
+    assert "Pythons:" in output
+    assert "astmath, meowsay" in output
+    assert "Total:" in output
+
+    # astmath was run through its shim most recently, so meowsay gets pruned
+    run(["astmath", "1 + 1"], cwd=PACKAGES_INSTALL_PATH)
+    output = run([python_yen_path, "prune", "--keep", "1"])
+    assert "venv_meowsay" in output
+    assert "venv_astmath" not in output
+    assert not os.path.exists(os.path.join(PACKAGES_INSTALL_PATH, "venv_meowsay"))
+
+    output = run([python_yen_path, "uninstall", "astmath"])
+    assert "Uninstalled package" in output
+    assert not os.path.exists(os.path.join(PACKAGES_INSTALL_PATH, "venv_astmath"))
+
+
+def test_yen_sync(tmp_path: str) -> None:
+    venv_path = os.path.join(tmp_path, "venv")
+    requirements_path = os.path.join(tmp_path, "requirements.txt")
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write("meowsay==1.0.1\nastmath\n")
+
+    output = run(
+        [python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path]
+    )
+    assert "Created" in output
+    assert "2 added" in output
+
+    output = run(
+        [python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path]
+    )
+    assert "is up to date" in output
+
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write("meowsay==1.0.2\n")
+
+    output = run(
+        [python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path]
+    )
+    assert "Updated" in output
+    assert "1 added, 1 removed" in output
+
+    venv_python_path = os.path.join(
+        venv_path,
+        "Scripts" if platform.system() == "Windows" else "bin",
+        "python",
+    )
+    packages = run([venv_python_path, "-m", "pip", "freeze"])
+    assert "astmath" not in packages
+    assert "meowsay==1.0.2" in packages
+
+    # Dropping a line that is still a dependency of another one keeps it
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write("requests\nurllib3\n")
+    run([python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path])
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write("requests\n")
+    run([python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path])
+
+    run([venv_python_path, "-c", "import requests"])
+    packages = run([venv_python_path, "-m", "pip", "freeze"])
+    assert "urllib3==" in packages
+
+    # Constraint files and editable installs
+    project_path = os.path.join(tmp_path, "project")
+    os.makedirs(os.path.join(project_path, "yen_sync_project"))
+    with open(os.path.join(project_path, "pyproject.toml"), "w") as pyproject_file:
+        pyproject_file.write('[project]\nname = "yen-sync-project"\nversion = "0.1"\n')
+    with open(os.path.join(project_path, "yen_sync_project", "__init__.py"), "w"):
+        pass
+    with open(os.path.join(tmp_path, "constraints.txt"), "w") as constraints_file:
+        constraints_file.write("meowsay==1.0.1\n")
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write("-c constraints.txt\nmeowsay\n-e ./project\n")
+
+    run([python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path])
+    packages = run([venv_python_path, "-m", "pip", "freeze"])
+    assert "meowsay==1.0.1" in packages
+    run([venv_python_path, "-c", "import yen_sync_project"], cwd=tmp_path)
+
+    # Hash-pinned requirements, spread over continuation lines
+    with open(requirements_path, "w") as requirements_file:
+        requirements_file.write(
+            "meowsay==1.0.2 \\\n"
+            "    --hash=sha256:"
+            "0abea23110086f667f71902e1152d4acba8cfbf067e40af7d59b275064831de4 \\\n"
+            "    --hash=sha256:"
+            "ed11741513e7def5e3e82747c447bffb357ba6e44aa6949594bb016563a0f2c7\n"
+        )
+
+    run([python_yen_path, "sync", venv_path, "-p3.11", "-r", requirements_path])
+    packages = run([venv_python_path, "-m", "pip", "freeze"])
+    assert "meowsay==1.0.2" in packages
+
+
+def test_yen_matrix() -> None:
+    try:
+        output = run(
+            [python_yen_path, "matrix", "-p3.10,3.11", "--"]
+            + ["python", "-c", "import sys; print(sys.version_info[:2])"]
+        )
+        assert "(3, 10)" in output
+        assert "(3, 11)" in output
+        assert "Ran on 2 Python(s)" in output
+        assert os.path.isdir(os.path.join(".yen_matrix", "3.11"))
+
+        with pytest.raises(Failed):
+            run([python_yen_path, "matrix", "-p3.11", "--", "python", "-c", "exit(3)"])
+    finally:
+        shutil.rmtree(".yen_matrix", ignore_errors=True)
+
+
+def test_yen_verify() -> None:
+    run([python_yen_path, "install", "-p3.11", "meowsay"])
+    output = run([python_yen_path, "verify"])
+    assert "Package meowsay is intact." in output.replace("\033[1m", "").replace(
+        "\033[m", ""
+    )
+
+    venv_python_path = os.path.join(
+        PACKAGES_INSTALL_PATH,
+        "venv_meowsay",
+        "Scripts" if platform.system() == "Windows" else "bin",
+        "python",
+    )
+    meowsay_module_path = run(
+        [venv_python_path, "-c", "import meowsay; print(meowsay.__file__)"]
+    ).strip()
+    with open(meowsay_module_path, "a") as meowsay_module:
+        meowsay_module.write("raise SystemExit('damaged')\n")
+
+    with pytest.raises(Failed):
+        run([python_yen_path, "verify"])
+
+    output = run([python_yen_path, "verify", "--repair"])
+    assert "Repaired package" in output
+
+    run([python_yen_path, "verify"])
+    meowsay_output = run(["meowsay", "hi"], cwd=PACKAGES_INSTALL_PATH)
+    assert "< hi >" in meowsay_output
+
+
 def test_ensurepath() -> None:
     if "CI" not in os.environ:
         # Don't want to muddle the PATH locally.